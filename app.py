@@ -1,19 +1,47 @@
 from flask import Flask, render_template, jsonify, request, redirect, url_for, flash, abort
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from flask import send_from_directory, send_file
+from flask import send_from_directory, send_file, Response, session, g
 from flask_migrate import Migrate
 from datetime import datetime, timedelta
+import hashlib
+import mimetypes
 import os
+import threading
+import time
+from collections import Counter
+import click
 from apscheduler.schedulers.background import BackgroundScheduler
-import requests
 from werkzeug.utils import secure_filename
-import re
 from functools import wraps
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 # Import our modules
-from models import db, User, Article, NewsItem, PriceData, SiteSettings
+from models import db, User, Article, NewsItem, PriceData, SiteSettings, TrackedAsset
 from forms import LoginForm, RegistrationForm, ArticleForm, ProfileForm
 from crypto_news_scraper import SimpleCryptoRSSFeedScraper
+from feed_fetcher import FeedValidatorStore
+from feed_scheduler import AdaptiveFeedScheduler
+from url_utils import url_fingerprint
+from news_clustering import StoryClusterer
+from news_sources import registry as news_sources
+from price_cache import PriceSnapshot, price_entry
+from price_retention import run_retention
+from price_history import price_history, DEFAULT_POINTS
+from price_providers import Asset, build_price_provider
+from price_stream import PriceBroadcaster, stream_response
+from data_versions import DataVersions
+from price_validation import PriceValidator
+from market_analytics import analytics_cache, DEFAULT_RANGE as ANALYTICS_DEFAULT_RANGE
+from response_cache import build_response_cache
+from html_minify import minify_html
+from fragment_cache import FragmentCache, init_fragment_cache
+from homepage import HomepageModel, load_articles, load_news
+from compression import (StaticCompressor, choose_encoding, compress_response,
+                         encodings, serve_variant)
 
 # Import SEO modules
 from seo_routes import register_seo_routes
@@ -80,124 +108,384 @@ def create_slug(title):
     return SEOConfig.slugify(title)
 
 
+# ETag/Last-Modified validators so unchanged feeds are skipped between runs
+feed_validators = FeedValidatorStore(
+    os.environ.get('FEED_CACHE_PATH', 'feed_cache.json'))
+
+# Each feed is polled on its own schedule based on how often it publishes
+feed_scheduler = AdaptiveFeedScheduler(SimpleCryptoRSSFeedScraper().feeds)
+
+# Groups the same story syndicated by several sources
+story_clusterer = StoryClusterer()
+
+# Shared counters behind the API ETags; 'news' is the highest stored NewsItem id
+data_versions = DataVersions(
+    os.environ.get('DATA_VERSIONS_PATH', 'data_versions.json'))
+_news_version_seeded = False
+
+
+def get_news_version():
+    """Current news version; only the first call in a process may hit the database"""
+    global _news_version_seeded
+    version = data_versions.get('news')
+    if not version and not _news_version_seeded:
+        _news_version_seeded = True
+        try:
+            latest_id = db.session.query(db.func.max(NewsItem.id)).scalar()
+            if latest_id:
+                version = data_versions.advance('news', latest_id)
+        except Exception as e:
+            print(f"Error loading news version: {e}")
+    return version
+
+
+def conditional_json(etag, build):
+    """JSON response from ``build()`` or a bodyless 304 if the client has ``etag``"""
+    # Weak comparison, as compressed responses carry a weakened copy of the tag
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Let clients keep a copy but revalidate it on every use
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def warm_story_clusterer():
+    """Load the clustering window from the database once per process"""
+    since = datetime.utcnow() - timedelta(seconds=story_clusterer.window)
+    rows = db.session.query(
+        NewsItem.external_id, NewsItem.title, NewsItem.summary,
+        NewsItem.cluster_id, NewsItem.scraped_at
+    ).filter(NewsItem.scraped_at >= since).order_by(NewsItem.scraped_at.asc()).all()
+    # scraped_at is naive UTC, so convert it explicitly rather than via local time
+    epoch = datetime(1970, 1, 1)
+    story_clusterer.warm(
+        (key, title, summary, cluster_id, (scraped_at - epoch).total_seconds())
+        for key, title, summary, cluster_id, scraped_at in rows
+    )
+
+
+# Latest price per symbol, published by update_prices and read from memory
+price_snapshot = PriceSnapshot(
+    os.environ.get('PRICE_SNAPSHOT_PATH', 'price_snapshot.json'))
+
+# Fallback for /api/prices/stream when no price_stream_server.py runs. Each stream
+# holds a worker thread, so at most half the threads (gunicorn.conf.py) stream by default
+price_broadcaster = PriceBroadcaster(
+    price_snapshot,
+    max_clients=int(os.environ.get('PRICE_STREAM_MAX_CLIENTS') or
+                    max(1, int(os.environ.get('GUNICORN_THREADS', '8')) // 2)))
+
+
+@app.context_processor
+def inject_price_stream_url():
+    """Where pages open their price EventSource"""
+    return {'price_stream_url': os.environ.get('PRICE_STREAM_URL') or url_for('api_prices_stream')}
+
+# Coins shown in the sidebar price widget; /api/prices serves every tracked coin
+PRICE_WIDGET_SIZE = 8
+
+# CoinGecko first, then whatever is still missing from the secondaries
+price_provider = build_price_provider()
+
+# Rejects zero/outlier quotes and flags symbols that stopped updating
+price_validator = PriceValidator(
+    stale_after=int(os.environ.get('PRICE_STALE_AFTER_SECONDS', '900')))
+
+
+def warm_price_validator(symbols):
+    """Seed outlier detection with the last two hours of stored prices"""
+    since = datetime.utcnow() - timedelta(hours=2)
+    price_validator.warm(db.session.query(PriceData.symbol, PriceData.price_usd).filter(
+        PriceData.symbol.in_(symbols), PriceData.timestamp >= since
+    ).order_by(PriceData.timestamp.asc()).all())
+
+
+def tracked_symbols():
+    return [asset.symbol for asset in TrackedAsset.active_assets()]
+
+
+def load_latest_prices():
+    """Latest PriceData row per tracked symbol as snapshot entries"""
+    assets = TrackedAsset.active_assets()
+    latest = PriceData.latest_for_symbols([asset.symbol for asset in assets])
+    prices = {}
+    for asset in assets:
+        if asset.symbol in latest:
+            prices[asset.symbol.lower()] = dict(price_entry(latest[asset.symbol]),
+                                                name=asset.name)
+    return prices
+
+
+def get_latest_prices():
+    """``(version, prices)`` from the snapshot, without touching the database
+
+    Only a cold start with no snapshot published by any worker yet falls
+    back to the database, once per process.
+    """
+    version, prices = price_snapshot.get()
+    if not prices and not price_snapshot.seeded:
+        try:
+            price_snapshot.seed(load_latest_prices())
+        except Exception as e:
+            print(f"Error loading prices: {e}")
+            price_snapshot.seed({})
+        version, prices = price_snapshot.get()
+    return version, prices
+
+
+# Full-page cache for anonymous visitors: endpoint -> data versions the page shows
+CACHED_PAGES = {
+    'index': ('news', 'news_generation', 'articles', 'prices'),
+    'news_page': ('news', 'news_generation'),
+    'analysis_page': ('articles',),
+    'view_article': ('articles',),
+    'author_profile': ('articles', 'users'),
+}
+response_cache = build_response_cache()
+
+# Responses below this size are sent uncompressed
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+
+# gzip/brotli copies of static files, made once per file version
+# Relative to the app, not the cwd, like the static folder itself
+static_compressor = StaticCompressor(
+    app.static_folder,
+    os.path.join(app.root_path, os.environ.get('STATIC_COMPRESSED_DIR', 'static_compressed')),
+    min_size=COMPRESS_MIN_SIZE)
+
+
+def send_static(filename):
+    """Static files, from a precompressed copy when the client accepts one"""
+    encoding = choose_encoding(request.accept_encodings, encodings())
+    path = static_compressor.variant_path(filename, encoding) if encoding else None
+    if path is None:
+        response = app.send_static_file(filename)
+    else:
+        response = send_file(path, mimetype=mimetypes.guess_type(filename)[0],
+                             max_age=app.get_send_file_max_age(filename))
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+app.view_functions['static'] = send_static
+
+# Views of article pages served from the cache, added to the database in batches
+pending_article_views = Counter()
+_article_views_lock = threading.Lock()
+
+
+def page_versions(names):
+    versions = data_versions.all()
+    values = {}
+    for name in names:
+        if name == 'news':
+            values[name] = get_news_version()
+        elif name == 'prices':
+            values[name] = get_latest_prices()[0]
+        else:
+            values[name] = versions.get(name, 0)
+    return values
+
+
+# Template blocks wrapped in {% cache %}, rendered once per data change
+fragment_cache = FragmentCache(page_versions)
+init_fragment_cache(app, fragment_cache)
+
+
+def price_widget():
+    return {
+        symbol: {'price': entry['price'], 'change': entry['change_24h']}
+        for symbol, entry in list(get_latest_prices()[1].items())[:PRICE_WIDGET_SIZE]
+    }
+
+
+# Top news, latest articles and price widget, served from memory
+homepage = HomepageModel(page_versions, {
+    'news': load_news,
+    'articles': load_articles,
+    'prices': price_widget,
+})
+
+
+def cacheable_request():
+    """Anonymous GET of a cached page with nothing session-specific to show"""
+    return (request.method == 'GET' and request.endpoint in CACHED_PAGES and
+            '_user_id' not in session and '_flashes' not in session and
+            app.config.get('REMEMBER_COOKIE_NAME', 'remember_token') not in request.cookies)
+
+
+def record_article_view(slug):
+    with _article_views_lock:
+        pending_article_views[slug] += 1
+
+
+def flush_article_views():
+    """Add the views counted on cached article pages to Article.views"""
+    with _article_views_lock:
+        views = dict(pending_article_views)
+        pending_article_views.clear()
+    if not views:
+        return
+    try:
+        with app.app_context():
+            for slug, count in views.items():
+                db.session.execute(db.update(Article).where(Article.slug == slug)
+                                   .values(views=Article.views + count))
+            db.session.commit()
+    except Exception as e:
+        print(f"Error saving article views: {e}")
+
+
 # Scheduled tasks
-def update_news():
-    """Update news from scraper and save to database"""
-    print("Updating cryptocurrency news...")
+def update_news(force=False):
+    """Update news from the feeds that are due and save to database"""
+    feeds = feed_scheduler.all_feeds() if force else feed_scheduler.due_feeds()
+    if not feeds:
+        return
+
+    print(f"Updating cryptocurrency news from {', '.join(feeds)}...")
     try:
-        scraper = SimpleCryptoRSSFeedScraper()
-        articles = scraper.scrape_all()
+        scraper = SimpleCryptoRSSFeedScraper(validators=feed_validators)
+        articles = scraper.scrape_all(feeds=feeds)
+        feed_scheduler.record_scrape(scraper.responses, scraper.articles_by_source)
 
         with app.app_context():
-            for article_data in articles:
-                # Check if article already exists
-                existing = NewsItem.query.filter_by(
-                    external_id=article_data['id']).first()
-                if not existing:
-                    news_item = NewsItem(
-                        external_id=article_data['id'],
-                        title=article_data['title'],
-                        url=article_data['url'],
-                        summary=article_data.get('summary', ''),
-                        source=article_data.get('source', 'Unknown'),
-                        published_date=datetime.fromisoformat(
-                            article_data.get('published', datetime.now().isoformat()))
-                    )
-                    db.session.add(news_item)
-
-            db.session.commit()
-            print(f"News update complete. Added new articles.")
+            if not story_clusterer.warmed:
+                warm_story_clusterer()
+            counts = NewsItem.bulk_ingest(articles, clusterer=story_clusterer)
+            # Only now are the feeds' items stored, so only now may the next
+            # poll treat an unchanged feed as already seen
+            feed_validators.commit(scraper.responses.values())
+            news_sources.commit_seen(scraper.responses.values())
+            if counts['inserted']:
+                data_versions.advance(
+                    'news', db.session.query(db.func.max(NewsItem.id)).scalar() or 0)
+                homepage.refresh('news')
+            print(f"News update complete. Added {counts['inserted']} new "
+                  f"articles, skipped {counts['skipped']}.")
     except Exception as e:
         print(f"Error updating news: {e}")
 
 
 def update_prices():
-    """Update cryptocurrency prices"""
+    """Update prices for every tracked asset"""
     print("Updating cryptocurrency prices...")
     try:
-        url = "https://api.coingecko.com/api/v3/simple/price"
-        params = {
-            'ids': 'bitcoin,ethereum,binancecoin,ripple,cardano,solana,polkadot,dogecoin',
-            'vs_currencies': 'usd',
-            'include_24hr_change': 'true',
-            'include_market_cap': 'true',
-            'include_24hr_vol': 'true'
-        }
-
-        # Disable SSL verification for macOS issues
-        import urllib3
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        response = requests.get(url, params=params, verify=False)
-        data = response.json()
-
-        crypto_names = {
-            'bitcoin': 'BTC',
-            'ethereum': 'ETH',
-            'binancecoin': 'BNB',
-            'ripple': 'XRP',
-            'cardano': 'ADA',
-            'solana': 'SOL',
-            'polkadot': 'DOT',
-            'dogecoin': 'DOGE'
-        }
-
         with app.app_context():
-            for crypto_id, info in data.items():
-                price_data = PriceData(
-                    symbol=crypto_names.get(crypto_id, crypto_id).upper(),
-                    name=crypto_names.get(crypto_id, crypto_id),
-                    price_usd=info.get('usd', 0),
-                    change_24h=info.get('usd_24h_change', 0),
-                    market_cap=info.get('usd_market_cap', 0),
-                    volume_24h=info.get('usd_24h_vol', 0)
-                )
-                db.session.add(price_data)
+            assets = [Asset(a.symbol, a.coingecko_id, a.name)
+                      for a in TrackedAsset.active_assets()]
+
+            if not price_validator.warmed:
+                warm_price_validator([asset.symbol for asset in assets])
+
+        # No database session is held while waiting on the provider
+        quotes = price_provider.fetch(assets)
+        if not quotes:
+            price_validator.record_failure('no prices received')
+            print("Price update failed: no prices received.")
+            return
+
+        quotes = price_validator.validate(quotes, [asset.symbol for asset in assets])
+        if not quotes:
+            print("Price update failed: every price was rejected.")
+            return
 
+        timestamp = datetime.utcnow()
+        rows = [dict(quotes[asset.symbol], timestamp=timestamp)
+                for asset in assets if asset.symbol in quotes]
+
+        with app.app_context():
+            db.session.execute(db.insert(PriceData), rows)
             db.session.commit()
-            print("Price update complete.")
+
+            # Keep the last known price of coins missing from this response,
+            # drop coins that are no longer tracked, and follow display order
+            previous = get_latest_prices()[1]
+            fresh = {row['symbol'].lower(): price_entry(PriceData(**row)) for row in rows}
+            prices = {}
+            for asset in assets:
+                key = asset.symbol.lower()
+                if key in fresh or key in previous:
+                    prices[key] = fresh.get(key) or previous[key]
+            version = price_snapshot.publish(prices)
+            price_broadcaster.notify()
+            homepage.refresh('prices')
+            print(f"Price update complete: {len(rows)}/{len(assets)} coins "
+                  f"(snapshot v{version}).")
     except Exception as e:
+        price_validator.record_failure(str(e))
         print(f"Error updating prices: {e}")
 
 
+def update_price_retention():
+    """Roll raw prices into hourly/daily OHLC and prune expired rows"""
+    try:
+        with app.app_context():
+            counts = run_retention()
+            print(f"Price retention complete: {counts}")
+    except Exception as e:
+        print(f"Error running price retention: {e}")
+
+
+# Held for the life of the process that runs the shared jobs
+_scheduler_lock = None
+
+
+def claim_shared_jobs():
+    """Schedule news, price and retention jobs in exactly one process.
+
+    Every gunicorn worker imports this module, but only the one holding
+    SCHEDULER_LOCK_PATH runs these jobs, so prices are not stored twice
+    and rollups never race. Each worker retries every minute, so another
+    one takes over when the holder exits.
+    """
+    global _scheduler_lock
+    if _scheduler_lock is not None:
+        return
+    if fcntl is not None:
+        path = os.environ.get('SCHEDULER_LOCK_PATH', 'scheduler.lock')
+        try:
+            lock_file = open(path, 'w')
+        except OSError as e:
+            print(f"Could not open scheduler lock {path}: {e}")
+            return
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return
+        _scheduler_lock = lock_file
+    else:
+        _scheduler_lock = True
+
+    # Cheap tick; AdaptiveFeedScheduler decides which feeds are actually due
+    scheduler.add_job(func=update_news, trigger="interval",
+                      minutes=1, id='news_updater')
+    scheduler.add_job(func=update_prices, trigger="interval",
+                      minutes=5, id='price_updater')
+    scheduler.add_job(func=update_price_retention, trigger="interval",
+                      hours=1, id='price_retention')
+    print(f"Scheduled news and price jobs in process {os.getpid()}")
+
+
 # Schedule tasks
-scheduler.add_job(func=update_news, trigger="interval",
-                  hours=1, id='news_updater')
-scheduler.add_job(func=update_prices, trigger="interval",
-                  minutes=5, id='price_updater')
+claim_shared_jobs()
+scheduler.add_job(func=claim_shared_jobs, trigger="interval",
+                  minutes=1, id='claim_shared_jobs')
+# Views are counted in each worker's memory, so every worker flushes its own
+scheduler.add_job(func=flush_article_views, trigger="interval",
+                  minutes=1, id='article_views')
 
 
 # Routes
 @app.route('/')
 def index():
     """Main page with news and price ticker"""
-    try:
-        # Get latest news
-        news = NewsItem.query.order_by(
-            NewsItem.published_date.desc()).limit(15).all()
-    except:
-        news = []
-
-    try:
-        # Get latest articles
-        articles = Article.query.filter_by(published=True).order_by(
-            Article.published_at.desc()).limit(5).all()
-    except:
-        articles = []
-
-    # Get latest prices
-    latest_prices = {}
-    try:
-        symbols = ['BTC', 'ETH', 'BNB', 'XRP', 'ADA', 'SOL', 'DOT', 'DOGE']
-        for symbol in symbols:
-            price = PriceData.query.filter_by(symbol=symbol).order_by(
-                PriceData.timestamp.desc()).first()
-            if price:
-                latest_prices[symbol.lower()] = {
-                    'price': price.price_usd,
-                    'change': price.change_24h
-                }
-    except:
-        pass
+    home = homepage.get()
 
     # Generate SEO metadata
     seo_meta = SEOConfig.generate_meta_tags(
@@ -207,9 +495,9 @@ def index():
     )
 
     return render_template('index_enhanced.html',
-                           news=news,
-                           articles=articles,
-                           prices=latest_prices,
+                           news=home['news'],
+                           articles=home['articles'],
+                           prices=home['prices'],
                            seo_meta=seo_meta)
 
 
@@ -294,6 +582,7 @@ def profile():
         current_user.username = form.username.data
         current_user.email = form.email.data
         db.session.commit()
+        data_versions.bump('users')
         flash('Profile updated successfully!')
         return redirect(url_for('profile'))
 
@@ -325,6 +614,8 @@ def new_article():
 
         db.session.add(article)
         db.session.commit()
+        data_versions.bump('articles')
+        homepage.refresh('articles')
 
         flash('Article created successfully!')
         return redirect(url_for('view_article', slug=article.slug))
@@ -407,6 +698,8 @@ def edit_article(slug):
             article.published_at = datetime.utcnow()
 
         db.session.commit()
+        data_versions.bump('articles')
+        homepage.refresh('articles')
         flash('Article updated successfully!')
         return redirect(url_for('view_article', slug=article.slug))
 
@@ -443,8 +736,9 @@ def admin_dashboard():
         stats['news_today'] = NewsItem.query.filter(
             NewsItem.scraped_at >= datetime.utcnow().date()
         ).count()
-        stats['latest_price_update'] = PriceData.query.order_by(
-            PriceData.timestamp.desc()).first()
+        latest = PriceData.latest_for_symbols(tracked_symbols()).values()
+        stats['latest_price_update'] = max(
+            latest, key=lambda row: row.timestamp, default=None)
     except Exception as e:
         print(f"Error getting stats: {e}")
 
@@ -568,7 +862,7 @@ def admin_settings():
 @admin_required
 def admin_update_news():
     """Manually trigger news update"""
-    update_news()
+    update_news(force=True)
     flash('News update triggered successfully!')
     return redirect(url_for('admin_dashboard'))
 
@@ -582,40 +876,160 @@ def admin_update_prices():
     return redirect(url_for('admin_dashboard'))
 
 
+@app.route('/admin/feed-schedule')
+@admin_required
+def admin_feed_schedule():
+    """Per-feed polling intervals and error counts"""
+    return jsonify(feed_scheduler.status())
+
+
+@app.route('/admin/price-providers')
+@admin_required
+def admin_price_providers():
+    """Circuit state, last error and latency per price provider"""
+    return jsonify(price_provider.status())
+
+
+@app.route('/admin/response-cache')
+@admin_required
+def admin_response_cache():
+    """Page cache hit rate, fills and size"""
+    return jsonify(response_cache.stats() if response_cache else {'backend': 'off'})
+
+
+@app.route('/admin/fragment-cache')
+@admin_required
+def admin_fragment_cache():
+    """Hit rate and render time per cached template fragment"""
+    return jsonify(fragment_cache.stats())
+
+
+@app.route('/admin/source-metrics')
+@admin_required
+def admin_source_metrics():
+    """Fetch latency, bytes, items and errors per news source"""
+    return jsonify(news_sources.metrics())
+
+
 # API routes
 @app.route('/api/news')
 def api_news():
-    """API endpoint for news data"""
+    """API endpoint for news data; ?since=<version> returns only newer stories"""
+    version = get_news_version()
+    since = request.args.get('since', type=int)
+    etag = f"news-{version}-{data_versions.get('news_generation')}"
+    if since is not None:
+        etag += f'-since-{since}'
+
     try:
-        news = NewsItem.query.order_by(
-            NewsItem.published_date.desc()).limit(20).all()
-        return jsonify([item.to_dict() for item in news])
-    except:
+        if since is None:
+            response = conditional_json(etag, lambda: [
+                item.to_dict() for item in NewsItem.latest_stories(20)])
+        else:
+            response = conditional_json(etag, lambda: {
+                'version': version,
+                'items': [item.to_dict() for item in NewsItem.latest_stories(20, since_id=since)]
+                if since < version else []
+            })
+    except Exception as e:
+        print(f"Error loading news: {e}")
         return jsonify([])
 
+    response.headers['X-News-Version'] = str(version)
+    return response
+
+
+@app.route('/api/home')
+def api_home():
+    """The homepage model: top news, latest articles and the price widget"""
+    # One read, so the ETag names exactly the versions the body was built from
+    home = homepage.get()
+    return conditional_json(homepage.etag(home), lambda: homepage.as_json(home))
+
 
 @app.route('/api/prices')
 def api_prices():
-    """API endpoint for latest prices"""
-    latest_prices = {}
+    """API endpoint for latest prices; ?since=<version> returns only what changed"""
+    version, latest_prices = get_latest_prices()
+    since = request.args.get('since', type=int)
+    stale = price_validator.stale_symbols(latest_prices)
+    # Staleness changes with time alone, so it is part of the validator too
+    etag = f'prices-{version}'
+    if stale:
+        etag += '-stale-' + hashlib.blake2b(
+            ','.join(sorted(stale)).encode(), digest_size=4).hexdigest()
+
+    if since is None:
+        response = conditional_json(etag, lambda: {
+            symbol: dict(entry, stale=symbol in stale)
+            for symbol, entry in latest_prices.items()
+        })
+    else:
+        response = conditional_json(f'{etag}-since-{since}',
+                                    lambda: dict(price_snapshot.changes_since(since), stale=stale))
+    response.headers['X-Price-Version'] = str(version)
+    return response
+
+
+@app.route('/api/prices/health')
+def api_prices_health():
+    """Refresh counters and stale symbols; 503 when most prices are stale"""
+    status = price_validator.status(get_latest_prices()[1])
+    return jsonify(status), 200 if status['healthy'] else 503
+
+
+@app.route('/api/analytics')
+def api_analytics():
+    """Volatility, SMA/EMA, drawdown and correlations for the tracked coins"""
+    version = get_latest_prices()[0]
     try:
-        symbols = ['BTC', 'ETH', 'BNB', 'XRP', 'ADA', 'SOL', 'DOT', 'DOGE']
-
-        for symbol in symbols:
-            price = PriceData.query.filter_by(symbol=symbol).order_by(
-                PriceData.timestamp.desc()).first()
-            if price:
-                latest_prices[symbol.lower()] = {
-                    'price': price.price_usd,
-                    'change_24h': price.change_24h,
-                    'market_cap': price.market_cap,
-                    'volume_24h': price.volume_24h,
-                    'updated': price.timestamp.isoformat()
-                }
-    except:
-        pass
+        symbols = tracked_symbols()
+        analytics = analytics_cache.get(
+            version, symbols, request.args.get('range', ANALYTICS_DEFAULT_RANGE))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error computing market analytics: {e}")
+        return jsonify({'error': 'Market analytics are temporarily unavailable'}), 503
+    response = jsonify(analytics)
+    response.headers['X-Price-Version'] = str(version)
+    return response
+
 
-    return jsonify(latest_prices)
+@app.route('/api/prices/stream')
+def api_prices_stream():
+    """Server-Sent Events: a snapshot on connect, then a delta per price refresh.
+
+    Production traffic goes to price_stream_server.py instead (see
+    PRICE_STREAM_URL); this thread-bound route serves single-process setups.
+    """
+    get_latest_prices()
+    return stream_response(price_broadcaster, request.headers.get('Last-Event-ID'))
+
+
+@app.route('/api/prices/<symbol>/history')
+def api_price_history(symbol):
+    """Fixed-size OHLC (or LTTB line) history for charts"""
+    try:
+        history = price_history(
+            symbol,
+            range_name=request.args.get('range', '24h'),
+            points=request.args.get('points', DEFAULT_POINTS, type=int),
+            method=request.args.get('method', 'ohlc')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error loading price history for {symbol}: {e}")
+        return jsonify({'error': 'Price history is temporarily unavailable'}), 503
+
+    response = jsonify(history)
+    # Identical for everyone until the slot ends, so browsers and proxies can share it
+    max_age = max(0, int(history['expires'] - time.time()))
+    response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    return response
 
 
 # New SEO-friendly routes
@@ -721,22 +1135,56 @@ def sitemap():
     )
     return response
 
-# Performance optimization
+# Registered before the page cache hooks so it runs after them
 @app.after_request
-def optimize_response(response):
-    """Optimize responses for better performance"""
-    # Compress HTML responses
-    if response.content_type == 'text/html; charset=utf-8':
-        # Remove unnecessary whitespace
-        response.direct_passthrough = False
-        try:
-            response.data = re.sub(b'>\s+<', b'><', response.data)
-        except:
-            pass
+def compress_dynamic_response(response):
+    """Gzip responses that were not served from stored variants"""
+    return compress_response(response, request.accept_encodings, COMPRESS_MIN_SIZE)
+
+
+@app.before_request
+def serve_cached_page():
+    """Answer anonymous page views from the response cache"""
+    if response_cache is None or not cacheable_request():
+        return None
+
+    key = response_cache.make_key(request.path, request.args,
+                                  page_versions(CACHED_PAGES[request.endpoint]))
+    page, fill_lock = response_cache.lookup(key)
+    if page is None:
+        g.page_cache_fill = (key, fill_lock)
+        return None
 
+    if request.endpoint == 'view_article':
+        record_article_view(request.view_args['slug'])
+    response = Response(page.body, status=page.status, headers=page.headers)
+    response.headers['X-Cache'] = 'HIT'
+    response.headers['Age'] = str(int(time.time() - page.created))
+    return serve_variant(response, page.variants, request.accept_encodings)
+
+
+@app.after_request
+def fill_page_cache(response):
+    """Minify, compress and store a freshly rendered cacheable page"""
+    fill = g.get('page_cache_fill')
+    if fill is not None:
+        # Minified once per fill here rather than on every request
+        if response.mimetype == 'text/html' and not response.is_streamed:
+            response.set_data(minify_html(response.get_data(as_text=True)))
+        page = response_cache.store(fill[0], response)
+        response.headers['X-Cache'] = 'MISS'
+        if page is not None:
+            serve_variant(response, page.variants, request.accept_encodings)
     return response
 
 
+@app.teardown_request
+def release_page_cache_lock(error=None):
+    fill = g.pop('page_cache_fill', None)
+    if fill is not None and fill[1] is not None:
+        fill[1].release()
+
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -781,6 +1229,94 @@ def create_admin():
     print(f"Admin user {username} created successfully!")
 
 
+@app.cli.command()
+def rehash_news():
+    """Re-key stored news items by canonical URL fingerprint."""
+    keep = {}
+    duplicates = []
+
+    # Oldest first so the original copy of a duplicated story is the one kept
+    for item in NewsItem.query.order_by(NewsItem.scraped_at.asc(), NewsItem.id.asc()):
+        fingerprint = url_fingerprint(item.url)
+        if fingerprint in keep:
+            duplicates.append(item)
+        else:
+            keep[fingerprint] = item
+
+    # Delete first so no update collides with a duplicate's external_id
+    for item in duplicates:
+        db.session.delete(item)
+    db.session.flush()
+
+    rehashed = 0
+    for fingerprint, item in keep.items():
+        if item.external_id != fingerprint:
+            item.external_id = fingerprint
+            rehashed += 1
+
+    db.session.commit()
+    # Re-keying changes output without adding ids, so move the news ETags on
+    data_versions.bump('news_generation')
+    removed = len(duplicates)
+    print(f"Re-keyed {rehashed} news items, removed {removed} duplicates.")
+
+
+@app.cli.command()
+def migrate_news_clusters():
+    """Add news_items.cluster_id to an existing database (run on each deploy)."""
+    if NewsItem.migrate_cluster_column():
+        print("Added news_items.cluster_id")
+    else:
+        print("news_items.cluster_id already present")
+
+
+@app.cli.command()
+@click.argument('symbol')
+@click.argument('coingecko_id')
+@click.option('--name', help='Display name, e.g. "Chainlink"')
+def track_asset(symbol, coingecko_id, name):
+    """Start fetching and serving prices for a coin."""
+    TrackedAsset.seed_defaults()
+    asset = TrackedAsset.query.filter_by(symbol=symbol.upper()).first()
+    if asset is None:
+        position = db.session.query(db.func.max(TrackedAsset.position)).scalar()
+        asset = TrackedAsset(symbol=symbol.upper(), position=(position or 0) + 1)
+        db.session.add(asset)
+    asset.coingecko_id = coingecko_id
+    asset.name = name or asset.name or symbol.upper()
+    asset.active = True
+    db.session.commit()
+    print(f"Tracking {asset.symbol} ({asset.coingecko_id})")
+
+
+@app.cli.command()
+@click.argument('symbol')
+def untrack_asset(symbol):
+    """Stop fetching prices for a coin; its history is kept."""
+    asset = TrackedAsset.query.filter_by(symbol=symbol.upper()).first()
+    if asset is None:
+        print(f"{symbol.upper()} is not tracked")
+        return
+    asset.active = False
+    db.session.commit()
+    print(f"Stopped tracking {asset.symbol}")
+
+
+@app.cli.command()
+def rollup_prices():
+    """Roll price_data into OHLC tiers and prune expired rows now."""
+    counts = run_retention()
+    print(f"Rolled up {counts['rolled_1h']} hourly and {counts['rolled_1d']} daily rows, "
+          f"pruned {counts['pruned_raw']} raw and {counts['pruned_1h']} hourly rows")
+
+
+@app.cli.command()
+def compress_static():
+    """Precompress static files (run after each deploy)."""
+    count = static_compressor.compress_all()
+    print(f"{count} compressed static files in {static_compressor.directory}")
+
+
 @app.cli.command()
 def update_sitemap():
     """Manually update the sitemap"""
@@ -830,6 +1366,7 @@ if __name__ == '__main__':
         try:
             # Create tables if they don't exist
             db.create_all()
+            NewsItem.migrate_cluster_column()
             print("✓ Database tables verified")
 
             # Check if we need to run initial setup
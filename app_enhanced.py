@@ -135,13 +135,11 @@ def index():
     # Get latest prices
     latest_prices = {}
     symbols = ['BTC', 'ETH', 'BNB', 'XRP', 'ADA', 'SOL', 'DOT', 'DOGE']
-    for symbol in symbols:
-        price = PriceData.query.filter_by(symbol=symbol).order_by(PriceData.timestamp.desc()).first()
-        if price:
-            latest_prices[symbol.lower()] = {
-                'price': price.price_usd,
-                'change': price.change_24h
-            }
+    for symbol, price in PriceData.latest_for_symbols(symbols).items():
+        latest_prices[symbol.lower()] = {
+            'price': price.price_usd,
+            'change': price.change_24h
+        }
     
     return render_template('index_enhanced.html', 
                          news=news, 
@@ -316,7 +314,9 @@ def admin_dashboard():
         'news_today': NewsItem.query.filter(
             NewsItem.scraped_at >= datetime.utcnow().date()
         ).count(),
-        'latest_price_update': PriceData.query.order_by(PriceData.timestamp.desc()).first()
+        'latest_price_update': max(
+            PriceData.latest_for_symbols(['BTC', 'ETH', 'BNB', 'XRP', 'ADA', 'SOL', 'DOT', 'DOGE']).values(),
+            key=lambda row: row.timestamp, default=None)
     }
     
     # Get recent activities
@@ -444,16 +444,14 @@ def api_prices():
     latest_prices = {}
     symbols = ['BTC', 'ETH', 'BNB', 'XRP', 'ADA', 'SOL', 'DOT', 'DOGE']
     
-    for symbol in symbols:
-        price = PriceData.query.filter_by(symbol=symbol).order_by(PriceData.timestamp.desc()).first()
-        if price:
-            latest_prices[symbol.lower()] = {
-                'price': price.price_usd,
-                'change_24h': price.change_24h,
-                'market_cap': price.market_cap,
-                'volume_24h': price.volume_24h,
-                'updated': price.timestamp.isoformat()
-            }
+    for symbol, price in PriceData.latest_for_symbols(symbols).items():
+        latest_prices[symbol.lower()] = {
+            'price': price.price_usd,
+            'change_24h': price.change_24h,
+            'market_cap': price.market_cap,
+            'volume_24h': price.volume_24h,
+            'updated': price.timestamp.isoformat()
+        }
     
     return jsonify(latest_prices)
 
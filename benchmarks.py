@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for BlockWire News hot paths
+
+Usage:
+    python benchmarks.py summary [--rounds N]
+    python benchmarks.py scraper [--feeds N] [--rounds N] [--slow-ms MS] ...
+    python benchmarks.py minify [--items N] [--hits-per-fill N]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import re
+import resource
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from text_utils import html_to_text
+
+
+def _time_per_call(func, inputs, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for value in inputs:
+            func(value)
+    elapsed = time.perf_counter() - started
+    return elapsed / (rounds * len(inputs))
+
+
+def bench_summary(args):
+    """Compare html_to_text with the old per-entry BeautifulSoup path"""
+    with open(args.fixture, 'r', encoding='utf-8') as f:
+        articles = json.load(f)['articles']
+    descriptions = [a.get('description') or a.get('summary') or '' for a in articles]
+
+    def soup_summary(text):
+        summary = BeautifulSoup(text, 'html.parser').text.strip()
+        if len(summary) > 200:
+            summary = summary[:197] + '...'
+        return summary
+
+    def fast_summary(text):
+        return html_to_text(text, max_length=200)
+
+    mismatches = sum(1 for d in descriptions if soup_summary(d) != fast_summary(d))
+
+    soup = _time_per_call(soup_summary, descriptions, args.rounds)
+    fast = _time_per_call(fast_summary, descriptions, args.rounds)
+
+    print("Summary extraction")
+    print("=" * 50)
+    print(f"Descriptions:          {len(descriptions)} from {args.fixture}")
+    print(f"BeautifulSoup:         {soup * 1e6:8.1f} us/entry")
+    print(f"html_to_text:          {fast * 1e6:8.1f} us/entry")
+    print(f"Speedup:               {soup / fast:8.1f}x")
+    print(f"Output mismatches:     {mismatches}")
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def bench_scraper(args):
+    """Full scrape_all -> dedupe -> DB ingest path against replayed feeds"""
+    from flask import Flask
+
+    from crypto_news_scraper import SimpleCryptoRSSFeedScraper
+    from models import db, NewsItem
+    from news_clustering import StoryClusterer
+    from news_sources import RSSAdapter, registry
+    from replay_harness import ReplayServer
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.database
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    latencies = []
+    scraped = inserted = 0
+    elapsed = 0.0
+
+    with ReplayServer() as server, app.app_context():
+        feeds = server.scenario(feeds=args.feeds, slow_ms=args.slow_ms,
+                                errors=args.errors, huge_copies=args.huge_copies)
+
+        for _ in range(args.rounds):
+            db.drop_all()
+            db.create_all()
+            # Fresh adapters each round so no round benefits from the last one
+            for source, url in feeds.items():
+                registry.register(RSSAdapter(source, url, limit=args.limit,
+                                             streaming=not args.no_streaming))
+
+            scraper = SimpleCryptoRSSFeedScraper()
+            scraper.fetcher.deadline = args.deadline
+            # Every replayed feed shares one host, unlike real publishers
+            scraper.fetcher.per_host_limit = args.per_host_limit or args.feeds
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                articles = scraper.scrape_all(feeds=feeds)
+                counts = NewsItem.bulk_ingest(articles, clusterer=StoryClusterer())
+            elapsed += time.perf_counter() - started
+
+            scraped += len(articles)
+            inserted += counts['inserted']
+            latencies.extend(r.elapsed for r in scraper.responses.values())
+
+    print("Scraper pipeline (offline replay)")
+    print("=" * 50)
+    print(f"Feeds:                 {args.feeds} ({args.errors} erroring, "
+          f"slow={args.slow_ms}ms, huge x{args.huge_copies})")
+    print(f"Rounds:                {args.rounds}")
+    print(f"Articles scraped:      {scraped} ({inserted} inserted)")
+    print(f"Wall time:             {elapsed:8.3f} s")
+    print(f"Throughput:            {scraped / elapsed if elapsed else 0:8.1f} items/s")
+    print(f"Per-feed latency p50:  {_percentile(latencies, 50) * 1000:8.1f} ms")
+    print(f"Per-feed latency p99:  {_percentile(latencies, 99) * 1000:8.1f} ms")
+    print(f"Peak RSS:              {_peak_rss_mb():8.1f} MB")
+
+
+def _sample_page(articles, items):
+    """An index-like page: indented cards plus a pre-wrap article body and a <pre>"""
+    cards = []
+    for article in (articles * (items // max(len(articles), 1) + 1))[:items]:
+        cards.append(f"""
+            <article class="news-card">
+                <h3>
+                    <a href="{article.get('link', '#')}">{article.get('title', '')}</a>
+                </h3>
+                <p>
+                    {article.get('summary') or article.get('description') or ''}
+                </p>
+                <span>Source:</span> <span>{article.get('source', '')}</span>
+            </article>""")
+    body = '\n\n'.join((a.get('summary') or '')[:300] for a in articles[:5])
+    return f"""<!DOCTYPE html>
+<html>
+    <head>
+        <title>BlockWire News</title>
+        <!-- layout -->
+    </head>
+    <body>
+        <main>{''.join(cards)}
+        </main>
+        <div style="white-space: pre-wrap;">{body}
+    <b>Note</b> <i>indented</i>
+        </div>
+        <pre><code>
+    def f():
+        return 1
+</code>  <b>x</b> <b>y</b></pre>
+    </body>
+</html>
+"""
+
+
+def bench_minify(args):
+    """Regex minification on every request vs the tokenizer once per cache fill"""
+    from html_minify import minify_html
+
+    with open(args.fixture, 'r', encoding='utf-8') as f:
+        articles = json.load(f)['articles']
+    page = _sample_page(articles, args.items)
+    page_bytes = page.encode('utf-8')
+
+    def regex_minify(data):
+        return re.sub(b'>\\s+<', b'><', data)
+
+    def preformatted(html):
+        return re.findall(r'<pre>.*?</pre>|<div style="white-space: pre-wrap;">.*?</div>',
+                          html, re.DOTALL)
+
+    regex = _time_per_call(regex_minify, [page_bytes], args.rounds)
+    tokenizer = _time_per_call(minify_html, [page], args.rounds)
+    regex_out = regex_minify(page_bytes).decode('utf-8')
+    tokenizer_out = minify_html(page)
+
+    print("HTML minification")
+    print("=" * 50)
+    print(f"Page:                  {len(page_bytes) / 1024:8.1f} KB ({args.items} news cards)")
+    print(f"Regex output:          {len(regex_out.encode()) / 1024:8.1f} KB, "
+          f"{regex * 1e6:8.1f} us/call")
+    print(f"Tokenizer output:      {len(tokenizer_out.encode()) / 1024:8.1f} KB, "
+          f"{tokenizer * 1e6:8.1f} us/call")
+    print(f"Per request, regex:    {regex * 1e6:8.1f} us (every HTML response)")
+    print(f"Per request, cached:   {tokenizer / (args.hits_per_fill + 1) * 1e6:8.1f} us "
+          f"(one fill per {args.hits_per_fill} hits)")
+    print(f"Preformatted intact:   regex {preformatted(regex_out) == preformatted(page)}, "
+          f"tokenizer {preformatted(tokenizer_out) == preformatted(page)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    summary = subparsers.add_parser('summary', help='HTML summary extraction')
+    summary.add_argument('--fixture', default='crypto_news.json')
+    summary.add_argument('--rounds', type=int, default=200)
+    summary.set_defaults(func=bench_summary)
+
+    scraper = subparsers.add_parser('scraper', help='scrape -> dedupe -> ingest pipeline')
+    scraper.add_argument('--feeds', type=int, default=10)
+    scraper.add_argument('--rounds', type=int, default=5)
+    scraper.add_argument('--limit', type=int, default=5, help='entries kept per feed')
+    scraper.add_argument('--slow-ms', type=int, default=2000)
+    scraper.add_argument('--errors', type=int, default=1)
+    scraper.add_argument('--huge-copies', type=int, default=200)
+    scraper.add_argument('--deadline', type=float, default=30)
+    scraper.add_argument('--per-host-limit', type=int, default=0,
+                         help='connections per host (default: one per feed)')
+    scraper.add_argument('--no-streaming', action='store_true',
+                         help='parse with feedparser instead of lxml iterparse')
+    scraper.add_argument('--database', default='sqlite://',
+                         help='scratch database URL; its tables are dropped and recreated')
+    scraper.set_defaults(func=bench_scraper)
+
+    minify = subparsers.add_parser('minify', help='HTML minification of a rendered page')
+    minify.add_argument('--fixture', default='crypto_news.json')
+    minify.add_argument('--items', type=int, default=30, help='news cards on the page')
+    minify.add_argument('--rounds', type=int, default=200)
+    minify.add_argument('--hits-per-fill', type=int, default=100,
+                        help='cache hits served per rendered page')
+    minify.set_defaults(func=bench_minify)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""
+Response compression
+
+Cached pages and static files are compressed once, when they are stored.
+Each gets a gzip variant and, if the optional ``brotli`` package is
+installed, a brotli variant. Requests are then served the variant that
+best matches their Accept-Encoding, with no per-request compression.
+
+Responses that are never cached, such as API JSON and pages for
+logged-in users, are gzipped as they go out when they are larger than
+``min_size``. A streamed body is compressed chunk by chunk, so it is never
+buffered. Brotli is only used for precompressed variants: its
+on-the-fly speed at useful quality levels is no better than gzip's.
+"""
+
+import gzip
+import mimetypes
+import os
+import zlib
+from typing import Dict, Iterable, Iterator, Optional
+
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compressed once and served many times, so use the strongest levels
+GZIP_STORED_LEVEL = 9
+BROTLI_STORED_QUALITY = 11
+# Compressed per response
+GZIP_DYNAMIC_LEVEL = 5
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'application/xml',
+    'application/rss+xml', 'application/manifest+json', 'image/svg+xml',
+}
+
+
+def is_compressible(mimetype: Optional[str]) -> bool:
+    if not mimetype:
+        return False
+    # Compressing event streams would hold events back in the compressor
+    if mimetype == 'text/event-stream':
+        return False
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+def encodings() -> list:
+    """Content codings this process can produce, most preferred first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress_stored(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_STORED_QUALITY)
+    return gzip.compress(body, GZIP_STORED_LEVEL, mtime=0)
+
+
+def compress_variants(body: bytes, min_size: int = 1024) -> Dict[str, bytes]:
+    """Every supported encoding of ``body`` that is actually smaller"""
+    if len(body) < min_size:
+        return {}
+    variants = {encoding: compress_stored(body, encoding) for encoding in encodings()}
+    return {name: data for name, data in variants.items() if len(data) < len(body)}
+
+
+def choose_encoding(accept_encodings, available: Iterable[str]) -> Optional[str]:
+    """Best of ``available`` for a werkzeug Accept-Encoding header, or None"""
+    best = None
+    best_quality = 0
+    # Listed most preferred first, so ties go to the smaller encoding
+    for name in [name for name in encodings() if name in available]:
+        quality = accept_encodings[name]
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def _weaken_etag(response):
+    # Validators may not claim byte-identity across encodings
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def serve_variant(response, variants: Dict[str, bytes], accept_encodings):
+    """Switch ``response`` to the best precompressed variant the client accepts"""
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encodings, variants)
+    if encoding is not None:
+        response.set_data(variants[encoding])
+        response.headers['Content-Encoding'] = encoding
+        _weaken_etag(response)
+    return response
+
+
+def compress_response(response, accept_encodings, min_size: int = 1024):
+    """Gzip a response that has no stored variants on its way out"""
+    if response.status_code < 200 or response.status_code in (204, 304) or \
+            response.direct_passthrough or 'Content-Encoding' in response.headers or \
+            not is_compressible(response.mimetype):
+        return response
+    response.vary.add('Accept-Encoding')
+    if not accept_encodings['gzip']:
+        return response
+
+    if response.is_streamed:
+        response.response = gzip_stream(response.iter_encoded())
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+        response.set_data(gzip.compress(body, GZIP_DYNAMIC_LEVEL, mtime=0))
+    response.headers['Content-Encoding'] = 'gzip'
+    _weaken_etag(response)
+    return response
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = GZIP_DYNAMIC_LEVEL) -> Iterator[bytes]:
+    """Gzip ``chunks`` incrementally, flushing after each one"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if chunk:
+            # Sync flush so each chunk reaches the client as soon as it is produced
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+class StaticCompressor:
+    """Compressed copies of static files, refreshed when the source changes.
+
+    Copies live in ``directory`` as ``<path>.gz`` and ``<path>.br`` next to
+    a mirror of the static tree. They are made on first request or ahead
+    of time by ``compress_all``.
+    """
+
+    def __init__(self, static_folder: str, directory: str = 'static_compressed',
+                 min_size: int = 1024):
+        self.static_folder = static_folder
+        # Absolute, as send_file resolves relative paths against the app root
+        self.directory = os.path.abspath(directory)
+        self.min_size = min_size
+
+    def variant_path(self, filename: str, encoding: str) -> Optional[str]:
+        """Path of the up-to-date ``encoding`` copy of ``filename``, or None"""
+        source = safe_join(self.static_folder, filename)
+        if source is None or not is_compressible(mimetypes.guess_type(filename)[0]):
+            return None
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+        if stat.st_size < self.min_size:
+            return None
+
+        suffix = '.gz' if encoding == 'gzip' else '.br'
+        target = os.path.join(self.directory, filename + suffix)
+        try:
+            if os.stat(target).st_mtime_ns == stat.st_mtime_ns:
+                return target
+        except OSError:
+            pass
+        return self._compress(source, target, stat, encoding)
+
+    def _compress(self, source: str, target: str, stat, encoding: str) -> Optional[str]:
+        try:
+            with open(source, 'rb') as f:
+                body = f.read()
+            data = compress_stored(body, encoding)
+            if len(data) >= len(body):
+                return None
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = f'{target}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            # The copy carries the source mtime, so a changed source is noticed
+            os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            os.replace(tmp_path, target)
+            return target
+        except OSError as e:
+            print(f"Could not compress static file {source}: {e}")
+            return None
+
+    def compress_all(self) -> int:
+        """Create every missing or outdated copy; returns how many exist"""
+        count = 0
+        for root, _, files in os.walk(self.static_folder):
+            for name in files:
+                filename = os.path.relpath(os.path.join(root, name), self.static_folder)
+                for encoding in encodings():
+                    if self.variant_path(filename, encoding):
+                        count += 1
+        return count
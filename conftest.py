@@ -0,0 +1,26 @@
+"""
+Shared pytest fixtures
+"""
+
+import pytest
+from flask import Flask
+
+from models import db
+
+
+@pytest.fixture
+def app():
+    """Bare Flask app on an in-memory SQLite database with every table created.
+
+    app.py is not imported, so no scheduler starts and nothing touches the
+    network or PostgreSQL.
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
@@ -1,14 +1,15 @@
-import requests
-from bs4 import BeautifulSoup
 import json
 import datetime
-import time
 from typing import List, Dict
-import hashlib
 import feedparser
 import ssl
 import urllib3
 
+from feed_fetcher import FeedFetcher, FeedValidatorStore
+from news_sources import RSSAdapter, registry, run_sources
+from text_utils import html_to_text
+from url_utils import url_fingerprint
+
 # Fix SSL certificate issue on macOS
 if hasattr(ssl, '_create_unverified_context'):
     ssl._create_default_https_context = ssl._create_unverified_context
@@ -23,179 +24,77 @@ class CryptoNewsScraper:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         self.articles = []
+        self.responses = {}
+        self.fetcher = FeedFetcher(headers=self.headers)
 
     def generate_id(self, url: str) -> str:
-        """Generate unique ID for article based on URL"""
-        return hashlib.md5(url.encode()).hexdigest()[:8]
+        """Generate unique ID for article based on its canonical URL"""
+        return url_fingerprint(url)
 
-    def clean_html(self, text: str) -> str:
+    def clean_html(self, text: str, max_length: int = None) -> str:
         """Remove HTML tags from text"""
-        return BeautifulSoup(text, 'html.parser').get_text().strip()
+        return html_to_text(text, max_length=max_length)
+
+    def scrape_rss_feed(self, feed_url: str, source_name: str, limit: int = 10,
+                        content: bytes = None, response_headers: Dict = None) -> List[Dict]:
+        """Parse RSS feed and extract articles
 
-    def scrape_rss_feed(self, feed_url: str, source_name: str, limit: int = 10) -> List[Dict]:
-        """Parse RSS feed and extract articles"""
-        articles = []
+        When ``content`` is given the already-fetched body is parsed instead of
+        downloading ``feed_url`` again.
+        """
+        adapter = RSSAdapter(source_name, feed_url, limit=limit)
         try:
-            print(f"Fetching RSS feed from {source_name}...")
-            feed = feedparser.parse(feed_url)
-
-            if feed.bozo:
-                print(f"Warning: Feed parsing issues for {source_name}")
-
-            for entry in feed.entries[:limit]:
-                try:
-                    # Extract article data
-                    title = entry.get('title', 'No title')
-                    link = entry.get('link', '')
-
-                    # Get summary/description
-                    summary = ''
-                    if hasattr(entry, 'summary'):
-                        summary = self.clean_html(entry.summary)
-                    elif hasattr(entry, 'description'):
-                        summary = self.clean_html(entry.description)
-
-                    # Truncate summary to reasonable length
-                    if len(summary) > 200:
-                        summary = summary[:197] + '...'
-
-                    # Get publication date
-                    published = datetime.datetime.now().isoformat()
-                    if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                        published = datetime.datetime(
-                            *entry.published_parsed[:6]).isoformat()
-                    elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-                        published = datetime.datetime(
-                            *entry.updated_parsed[:6]).isoformat()
-
-                    article = {
-                        'id': self.generate_id(link),
-                        'title': title,
-                        'url': link,
-                        'summary': summary if summary else title,
-                        'source': source_name,
-                        'published': published,
-                        'scraped_at': datetime.datetime.now().isoformat()
-                    }
-                    articles.append(article)
-
-                except Exception as e:
-                    print(f"Error parsing entry from {source_name}: {e}")
-                    continue
+            if content is None:
+                print(f"Fetching RSS feed from {source_name}...")
+                feed = feedparser.parse(feed_url)
+
+                if feed.bozo:
+                    print(f"Warning: Feed parsing issues for {source_name}")
 
+                articles = adapter.parse_feed(feed)
+            else:
+                articles = adapter.parse_content(content, response_headers)
             print(
                 f"Successfully scraped {len(articles)} articles from {source_name}")
+            return articles
 
         except Exception as e:
             print(f"Error fetching RSS feed from {source_name}: {e}")
+            return []
 
-        return articles
+    def _scrape_source(self, name: str) -> List[Dict]:
+        adapter = registry.get(name)
+        if adapter is None:
+            print(f"{name} is not configured")
+            return []
+        articles_by_source, _ = run_sources([adapter], self.fetcher)
+        return articles_by_source[name]
 
     def scrape_cryptopanic_api(self) -> List[Dict]:
         """Fetch news from CryptoPanic API (no auth required for public posts)"""
-        articles = []
-        try:
-            print("Fetching from CryptoPanic API...")
-            url = "https://cryptopanic.com/api/v1/posts/?auth_token=YOUR_TOKEN&public=true"
-            # Note: CryptoPanic works without auth token for public posts
-            url = "https://cryptopanic.com/api/v1/posts/?public=true&limit=10"
-
-            response = requests.get(url, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-
-                for post in data.get('results', [])[:10]:
-                    article = {
-                        'id': self.generate_id(post.get('url', '')),
-                        'title': post.get('title', 'No title'),
-                        'url': post.get('url', ''),
-                        # CryptoPanic doesn't provide summaries
-                        'summary': post.get('title', '')[:200],
-                        'source': post.get('source', {}).get('title', 'CryptoPanic'),
-                        'published': post.get('published_at', datetime.datetime.now().isoformat()),
-                        'scraped_at': datetime.datetime.now().isoformat()
-                    }
-                    articles.append(article)
-
-                print(
-                    f"Successfully scraped {len(articles)} articles from CryptoPanic")
-            else:
-                print(
-                    f"CryptoPanic API returned status code: {response.status_code}")
-
-        except Exception as e:
-            print(f"Error fetching from CryptoPanic API: {e}")
-
-        return articles
+        print("Fetching from CryptoPanic API...")
+        return self._scrape_source('CryptoPanic')
 
     def scrape_newsapi(self) -> List[Dict]:
-        """Fetch crypto news from NewsAPI (requires free API key)"""
-        articles = []
-        try:
-            # Note: Get free API key from https://newsapi.org/
-            api_key = "YOUR_NEWSAPI_KEY"  # Replace with actual key
-            url = f"https://newsapi.org/v2/everything?q=cryptocurrency+OR+bitcoin+OR+ethereum&sortBy=publishedAt&language=en&apiKey={api_key}"
-
-            response = requests.get(url, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-
-                for item in data.get('articles', [])[:10]:
-                    article = {
-                        'id': self.generate_id(item.get('url', '')),
-                        'title': item.get('title', 'No title'),
-                        'url': item.get('url', ''),
-                        'summary': item.get('description', '')[:200] if item.get('description') else item.get('title', ''),
-                        'source': item.get('source', {}).get('name', 'News'),
-                        'published': item.get('publishedAt', datetime.datetime.now().isoformat()),
-                        'scraped_at': datetime.datetime.now().isoformat()
-                    }
-                    articles.append(article)
-
-                print(
-                    f"Successfully scraped {len(articles)} articles from NewsAPI")
-            else:
-                print(f"NewsAPI returned status code: {response.status_code}")
-
-        except Exception as e:
-            print(f"Error fetching from NewsAPI: {e}")
-
-        return articles
+        """Fetch crypto news from NewsAPI (requires NEWSAPI_KEY)"""
+        return self._scrape_source('NewsAPI')
 
     def scrape_all(self) -> List[Dict]:
-        """Scrape all configured news sources"""
+        """Scrape all registered news sources"""
         print("Starting cryptocurrency news scraping...")
         print("=" * 50)
 
-        # RSS Feeds that work reliably
-        rss_feeds = {
-            'CoinDesk': 'https://www.coindesk.com/arc/outboundfeeds/rss/',
-            'Cointelegraph': 'https://cointelegraph.com/rss',
-            'Bitcoin.com': 'https://news.bitcoin.com/feed/',
-            'Decrypt': 'https://decrypt.co/feed',
-            'CryptoSlate': 'https://cryptoslate.com/feed/',
-            'Bitcoin Magazine': 'https://bitcoinmagazine.com/feed',
-            'CoinJournal': 'https://coinjournal.net/news/feed/',
-            'Crypto News': 'https://crypto.news/feed/',
-            'BeInCrypto': 'https://beincrypto.com/feed/',
-            'Crypto Briefing': 'https://cryptobriefing.com/feed/'
-        }
-
-        # Scrape RSS feeds
-        for source, feed_url in rss_feeds.items():
-            articles = self.scrape_rss_feed(feed_url, source, limit=5)
+        # Every registered source (RSS feeds and JSON APIs) is fetched in parallel
+        articles_by_source, self.responses = run_sources(registry.all(), self.fetcher)
+        for articles in articles_by_source.values():
             self.articles.extend(articles)
-            time.sleep(0.5)  # Be respectful to servers
-
-        # Try CryptoPanic API (works without auth)
-        self.articles.extend(self.scrape_cryptopanic_api())
 
-        # Remove duplicates based on URL
-        seen_urls = set()
+        # Remove duplicates based on canonical URL
+        seen_ids = set()
         unique_articles = []
         for article in self.articles:
-            if article['url'] and article['url'] not in seen_urls:
-                seen_urls.add(article['url'])
+            if article['url'] and article['id'] not in seen_ids:
+                seen_ids.add(article['id'])
                 unique_articles.append(article)
 
         # Sort by published time (newest first)
@@ -227,95 +126,69 @@ class CryptoNewsScraper:
 
 
 class SimpleCryptoRSSFeedScraper:
-    def __init__(self):
+    def __init__(self, validators: FeedValidatorStore = None):
         # Only include feeds that are known to work
-        self.feeds = {
-            'CoinDesk': 'https://www.coindesk.com/arc/outboundfeeds/rss/',
-            'Cointelegraph': 'https://cointelegraph.com/rss',
-            'Bitcoin.com': 'https://news.bitcoin.com/feed/',
-            'Decrypt': 'https://decrypt.co/feed',
-            'CryptoSlate': 'https://cryptoslate.com/feed/'
-        }
+        self.feeds = {adapter.name: adapter.url for adapter in registry.core()}
         self.articles = []
+        self.responses = {}
+        self.articles_by_source = {}
+        # With a validator store, unchanged feeds are skipped without parsing
+        self.fetcher = FeedFetcher(validators=validators)
 
     def generate_id(self, url: str) -> str:
-        """Generate unique ID for article based on URL"""
-        return hashlib.md5(url.encode()).hexdigest()[:8]
+        """Generate unique ID for article based on its canonical URL"""
+        return url_fingerprint(url)
+
+    def parse_rss_feed(self, feed_url: str, source_name: str,
+                       content: bytes = None, response_headers: Dict = None) -> List[Dict]:
+        """Parse RSS feed and extract articles
 
-    def parse_rss_feed(self, feed_url: str, source_name: str) -> List[Dict]:
-        """Parse RSS feed and extract articles"""
-        articles = []
+        When ``content`` is given the already-fetched body is parsed instead of
+        downloading ``feed_url`` again.
+        """
+        adapter = RSSAdapter(source_name, feed_url)
         try:
-            print(f"Fetching {source_name}...")
-            feed = feedparser.parse(feed_url)
-
-            # Check if feed has entries
-            if not feed.entries:
-                print(f"  No entries found in {source_name} feed")
-                return articles
-
-            for entry in feed.entries[:5]:  # Get top 5 articles
-                try:
-                    title = entry.get('title', 'No title')
-                    link = entry.get('link', '')
-
-                    # Get summary
-                    summary = ''
-                    if hasattr(entry, 'summary'):
-                        summary = BeautifulSoup(
-                            entry.summary, 'html.parser').text.strip()
-                    elif hasattr(entry, 'description'):
-                        summary = BeautifulSoup(
-                            entry.description, 'html.parser').text.strip()
-
-                    # Limit summary length
-                    if len(summary) > 200:
-                        summary = summary[:197] + '...'
-
-                    # Get date
-                    published = datetime.datetime.now().isoformat()
-                    if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                        published = datetime.datetime(
-                            *entry.published_parsed[:6]).isoformat()
-
-                    article = {
-                        'id': self.generate_id(link),
-                        'title': title,
-                        'url': link,
-                        'summary': summary if summary else title[:200],
-                        'source': source_name,
-                        'published': published,
-                        'scraped_at': datetime.datetime.now().isoformat()
-                    }
-                    articles.append(article)
-
-                except Exception as e:
-                    print(f"  Error parsing entry: {e}")
-                    continue
+            if content is None:
+                print(f"Fetching {source_name}...")
+                feed = feedparser.parse(feed_url)
+
+                # Check if feed has entries
+                if not feed.entries:
+                    print(f"  No entries found in {source_name} feed")
+                    return []
 
+                articles = adapter.parse_feed(feed)
+            else:
+                articles = adapter.parse_content(content, response_headers)
             print(f"  Found {len(articles)} articles")
+            return articles
 
         except Exception as e:
             print(f"  Error: {e}")
+            return []
 
-        return articles
+    def scrape_all(self, feeds: Dict[str, str] = None) -> List[Dict]:
+        """Scrape all RSS feeds, or only the ``{source: url}`` subset given
 
-    def scrape_all(self) -> List[Dict]:
-        """Scrape all RSS feeds"""
+        Per-feed outcomes are left in ``self.responses`` and
+        ``self.articles_by_source`` for the polling scheduler.
+        """
+        feeds = self.feeds if feeds is None else feeds
         print("\nStarting RSS feed scraping...")
         print("-" * 40)
 
-        for source, feed_url in self.feeds.items():
-            articles = self.parse_rss_feed(feed_url, source)
+        # Fetch every feed in parallel; a slow host only costs its own slot
+        self.articles_by_source, self.responses = run_sources(
+            registry.resolve(feeds), self.fetcher)
+        for articles in self.articles_by_source.values():
             self.articles.extend(articles)
-            time.sleep(0.5)  # Be respectful
 
-        # Remove duplicates
-        seen_urls = set()
+        # Remove duplicates (the id is derived from the canonical URL)
+        seen_ids = set()
         unique_articles = []
         for article in self.articles:
-            if article['url'] not in seen_urls:
-                seen_urls.add(article['url'])
+            if article['id'] not in seen_ids:
+                seen_ids.add(article['id'])
                 unique_articles.append(article)
 
         # Sort by date
@@ -0,0 +1,95 @@
+"""
+Named data-version counters shared by every gunicorn worker
+
+Each counter only moves forward and is bumped by whoever changes the data
+behind it (update_news, article saves, ...). Readers get the current value
+from memory; the backing JSON file is re-read at most once per
+``check_interval`` seconds and only when its mtime changed, so a version
+check never touches the database.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class DataVersions:
+    """Monotonic counters keyed by name, mirrored to a JSON file"""
+
+    def __init__(self, path: str = 'data_versions.json', check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._file_mtime = None
+        self._next_check = 0.0
+
+    def _load_file(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._file_mtime:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._file_mtime = mtime
+        for name, value in data.items():
+            self._versions[name] = max(self._versions.get(name, 0), value)
+
+    def all(self) -> Dict[str, int]:
+        now = time.monotonic()
+        if now >= self._next_check:
+            with self._lock:
+                if now >= self._next_check:
+                    self._next_check = now + self.check_interval
+                    self._load_file()
+        return dict(self._versions)
+
+    def get(self, name: str) -> int:
+        return self.all().get(name, 0)
+
+    def _update(self, name: str, compute: Callable[[int], int]) -> int:
+        with self._lock:
+            lock_file = None
+            try:
+                if fcntl is not None:
+                    lock_file = open(f'{self.path}.lock', 'w')
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+                # Another worker may have moved the counter since our last read
+                self._load_file()
+                value = max(self._versions.get(name, 0), compute(self._versions.get(name, 0)))
+                self._versions[name] = value
+
+                tmp_path = f'{self.path}.{os.getpid()}.tmp'
+                try:
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump(self._versions, f)
+                    os.replace(tmp_path, self.path)
+                    self._file_mtime = os.stat(self.path).st_mtime_ns
+                except OSError as e:
+                    print(f"Could not write data versions to {self.path}: {e}")
+                return value
+            finally:
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+
+    def bump(self, name: str) -> int:
+        """Increment ``name`` and return its new value"""
+        return self._update(name, lambda current: current + 1)
+
+    def advance(self, name: str, value: int) -> int:
+        """Move ``name`` up to ``value`` (never down) and return it"""
+        return self._update(name, lambda current: value)
@@ -0,0 +1,277 @@
+"""
+Concurrent feed fetching for the news scrapers
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'application/rss+xml, application/atom+xml, application/xml;q=0.9, */*;q=0.8'
+}
+
+
+class FeedResponse:
+    """Raw result of fetching a single feed"""
+
+    def __init__(self, source: str, url: str):
+        self.source = source
+        self.url = url
+        self.status = None
+        self.content = b''
+        # Case-insensitive, as servers differ on 'ETag' vs 'etag'
+        self.headers = CaseInsensitiveDict()
+        self.error = None
+        self.elapsed = 0.0
+        self.not_modified = False
+        # Validators to record once this response's items are stored
+        self.validators = None
+        # Ids of the parsed items, marked as seen once they are stored
+        self.seen_ids = []
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status == 200 and not self.not_modified
+
+    def parser_headers(self) -> Dict[str, str]:
+        """Response headers in the form feedparser.parse expects"""
+        headers = {key.lower(): value for key, value in self.headers.items()}
+        headers.setdefault('content-location', self.url)
+        return headers
+
+    def __repr__(self):
+        return f'<FeedResponse {self.source} status={self.status} error={self.error}>'
+
+
+class FeedValidatorStore:
+    """Per-feed HTTP validators persisted to a small JSON file.
+
+    Keeps the ETag, Last-Modified and a hash of the last body seen for each
+    feed URL so unchanged feeds can be skipped without re-parsing them.
+    """
+
+    def __init__(self, path: str = 'feed_cache.json'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._validators = {}
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._validators = json.load(f)
+        except (OSError, ValueError):
+            self._validators = {}
+
+    def save(self):
+        """Write validators to disk if anything changed since the last save"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = dict(self._validators)
+            self._dirty = False
+
+        tmp_path = f'{self.path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save feed validators to {self.path}: {e}")
+
+    def get(self, url: str) -> Dict:
+        with self._lock:
+            return dict(self._validators.get(url, {}))
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        """Conditional request headers for ``url``"""
+        validators = self.get(url)
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def update(self, url: str, etag: Optional[str], last_modified: Optional[str],
+               content_hash: str):
+        with self._lock:
+            self._validators[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'content_hash': content_hash,
+                'checked_at': time.time()
+            }
+            self._dirty = True
+
+    def commit(self, responses: Iterable[FeedResponse]):
+        """Record the validators of ``responses`` and save them.
+
+        Call this only after the responses' items have been stored. Until
+        then a failed ingest leaves the old validators in place, so the
+        next poll fetches and parses the feed again instead of treating
+        it as unchanged.
+        """
+        for response in responses:
+            if response.validators is not None:
+                self.update(response.url, **response.validators)
+        self.save()
+
+    @staticmethod
+    def hash_content(content: bytes) -> str:
+        return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class FeedFetcher:
+    """Fetch many feeds in parallel.
+
+    Each host gets at most ``per_host_limit`` simultaneous connections and the
+    whole batch is bounded by ``deadline`` seconds, so one slow publisher
+    cannot hold up the rest of the scrape cycle.
+    """
+
+    def __init__(self, max_workers: int = 10, per_host_limit: int = 2,
+                 timeout: float = 10, deadline: float = 30,
+                 max_bytes: int = 5 * 1024 * 1024, headers: Optional[Dict] = None,
+                 validators: Optional[FeedValidatorStore] = None):
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_bytes = max_bytes
+        self.validators = validators
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=max_workers,
+                              pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._host_locks = {}
+        self._host_locks_guard = threading.Lock()
+
+    def _host_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc.lower()
+        with self._host_locks_guard:
+            if host not in self._host_locks:
+                self._host_locks[host] = threading.BoundedSemaphore(
+                    self.per_host_limit)
+            return self._host_locks[host]
+
+    def fetch(self, source: str, url: str, expires_at: float) -> FeedResponse:
+        """Fetch one feed, giving up once ``expires_at`` has passed
+
+        With a validator store attached the request is conditional, and a 304
+        or a body identical to the last one is reported as ``not_modified``.
+        """
+        result = FeedResponse(source, url)
+        request_headers = self.validators.request_headers(url) if self.validators else None
+        started = time.monotonic()
+        semaphore = self._host_semaphore(url)
+
+        if not semaphore.acquire(timeout=max(0, expires_at - started)):
+            result.error = 'deadline exceeded waiting for host slot'
+            return result
+
+        try:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                result.error = 'deadline exceeded'
+                return result
+
+            response = self.session.get(
+                url, headers=request_headers, stream=True,
+                timeout=(min(self.timeout, remaining), min(self.timeout, remaining)))
+            result.status = response.status_code
+            result.headers = response.headers
+
+            chunks = []
+            size = 0
+            with response:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        result.error = f'feed larger than {self.max_bytes} bytes'
+                        break
+                    if time.monotonic() > expires_at:
+                        result.error = 'deadline exceeded while reading body'
+                        break
+            result.content = b''.join(chunks)
+
+            if self.validators is not None:
+                self._check_validators(result)
+
+        except Exception as e:
+            result.error = str(e)
+        finally:
+            semaphore.release()
+            result.elapsed = time.monotonic() - started
+
+        return result
+
+    def _check_validators(self, result: FeedResponse):
+        """Mark ``result`` as not modified and attach its fresh validators"""
+        if result.status == 304:
+            result.not_modified = True
+            return
+        if result.status != 200 or result.error:
+            return
+
+        content_hash = FeedValidatorStore.hash_content(result.content)
+        previous = self.validators.get(result.url)
+        if previous.get('content_hash') == content_hash:
+            # Publisher ignores conditional requests but nothing changed
+            result.not_modified = True
+
+        result.validators = {
+            'etag': result.headers.get('ETag'),
+            'last_modified': result.headers.get('Last-Modified'),
+            'content_hash': content_hash,
+        }
+
+    def fetch_all(self, feeds: Dict[str, str]) -> Dict[str, FeedResponse]:
+        """Fetch every ``{source: url}`` feed concurrently.
+
+        Always returns one FeedResponse per source; feeds that did not finish
+        before the deadline come back with ``error`` set. New validators are
+        only attached to the responses; pass them to
+        ``FeedValidatorStore.commit`` once their items are stored.
+        """
+        expires_at = time.monotonic() + self.deadline
+        results = {}
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                      thread_name_prefix='feed-fetch')
+        futures = {
+            executor.submit(self.fetch, source, url, expires_at): source
+            for source, url in feeds.items()
+        }
+        done, not_done = wait(futures, timeout=self.deadline)
+        # Don't block the caller on stragglers; they stop at the deadline anyway
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        for future in done:
+            response = future.result()
+            results[response.source] = response
+
+        for future in not_done:
+            source = futures[future]
+            response = FeedResponse(source, feeds[source])
+            response.error = 'deadline exceeded'
+            response.elapsed = self.deadline
+            results[source] = response
+
+        return results
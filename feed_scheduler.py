@@ -0,0 +1,185 @@
+"""
+Adaptive per-feed polling for the news scraper
+"""
+
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+TTL_RE = re.compile(rb'<ttl>\s*(\d+)\s*</ttl>', re.IGNORECASE)
+SKIP_HOURS_RE = re.compile(rb'<skipHours>(.*?)</skipHours>', re.IGNORECASE | re.DOTALL)
+HOUR_RE = re.compile(rb'<hour>\s*(\d+)\s*</hour>', re.IGNORECASE)
+
+
+def parse_feed_hints(content: bytes):
+    """Return the RSS ``ttl`` (in minutes) and ``skipHours`` (UTC hours) hints"""
+    ttl = None
+    skip_hours = set()
+    if not content:
+        return ttl, skip_hours
+
+    match = TTL_RE.search(content)
+    if match:
+        ttl = int(match.group(1))
+
+    match = SKIP_HOURS_RE.search(content)
+    if match:
+        skip_hours = {int(h) % 24 for h in HOUR_RE.findall(match.group(1))}
+
+    return ttl, skip_hours
+
+
+class FeedPollState:
+    """Polling state for a single feed"""
+
+    def __init__(self, source: str, url: str, interval: float):
+        self.source = source
+        self.url = url
+        self.interval = interval
+        self.next_due = 0.0
+        self.last_polled = None
+        self.error_count = 0
+        # Exponentially weighted new items per second
+        self.item_rate = None
+        self.ttl = None
+        self.skip_hours = set()
+        self.seen_ids = []
+
+    def to_dict(self) -> Dict:
+        return {
+            'source': self.source,
+            'url': self.url,
+            'interval': round(self.interval),
+            'next_due': datetime.fromtimestamp(self.next_due, timezone.utc).isoformat(),
+            'error_count': self.error_count,
+            'items_per_hour': round(self.item_rate * 3600, 2) if self.item_rate is not None else None,
+            'ttl': self.ttl,
+            'skip_hours': sorted(self.skip_hours)
+        }
+
+
+class AdaptiveFeedScheduler:
+    """Decide which feeds are due for polling.
+
+    Busy feeds are polled more often and quiet ones less often, aiming for
+    roughly ``target_items`` new items per poll. Errors back off
+    exponentially, and the feed's own ``ttl``/``skipHours`` hints are honored.
+    """
+
+    def __init__(self, feeds: Dict[str, str], min_interval: float = 120,
+                 max_interval: float = 2 * 3600, initial_interval: float = 15 * 60,
+                 max_backoff: float = 6 * 3600, target_items: float = 2.0,
+                 smoothing: float = 0.3, max_seen: int = 200):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = initial_interval
+        self.max_backoff = max_backoff
+        self.target_items = target_items
+        self.smoothing = smoothing
+        self.max_seen = max_seen
+        self._lock = threading.Lock()
+        self.states = {
+            source: FeedPollState(source, url, initial_interval)
+            for source, url in feeds.items()
+        }
+
+    def due_feeds(self, now: Optional[float] = None) -> Dict[str, str]:
+        """``{source: url}`` for every feed whose next poll time has passed"""
+        now = time.time() if now is None else now
+        with self._lock:
+            return {state.source: state.url for state in self.states.values()
+                    if state.next_due <= now}
+
+    def all_feeds(self) -> Dict[str, str]:
+        return {state.source: state.url for state in self.states.values()}
+
+    def record_success(self, source: str, article_ids: List[str],
+                       ttl: Optional[int] = None, skip_hours: Optional[Set[int]] = None,
+                       now: Optional[float] = None):
+        """Update a feed's rate estimate after a successful (or 304) poll"""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self.states.get(source)
+            if state is None:
+                return
+
+            seen = set(state.seen_ids)
+            new_ids = [i for i in article_ids if i not in seen]
+            state.seen_ids = (new_ids + state.seen_ids)[:self.max_seen]
+
+            if state.last_polled is not None:
+                elapsed = max(now - state.last_polled, 1.0)
+                rate = len(new_ids) / elapsed
+                if state.item_rate is None:
+                    state.item_rate = rate
+                else:
+                    state.item_rate = (self.smoothing * rate +
+                                       (1 - self.smoothing) * state.item_rate)
+
+            if ttl is not None:
+                state.ttl = ttl
+            if skip_hours is not None:
+                state.skip_hours = skip_hours
+
+            state.error_count = 0
+            state.last_polled = now
+            state.interval = self._next_interval(state)
+            state.next_due = self._apply_skip_hours(state, now + state.interval)
+
+    def record_error(self, source: str, now: Optional[float] = None):
+        """Back off exponentially (with jitter) after a failed poll"""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self.states.get(source)
+            if state is None:
+                return
+            state.error_count += 1
+            backoff = min(self.max_backoff,
+                          state.interval * (2 ** state.error_count))
+            backoff *= random.uniform(0.8, 1.2)
+            state.next_due = now + backoff
+
+    def record_scrape(self, responses: Dict, articles_by_source: Dict[str, List[Dict]],
+                      now: Optional[float] = None):
+        """Feed the outcome of ``SimpleCryptoRSSFeedScraper.scrape_all`` back in"""
+        for source, response in responses.items():
+            if response.ok or response.not_modified:
+                ttl, skip_hours = parse_feed_hints(response.content)
+                article_ids = [a['id'] for a in articles_by_source.get(source, [])]
+                self.record_success(source, article_ids,
+                                    ttl=ttl, skip_hours=skip_hours or None, now=now)
+            else:
+                self.record_error(source, now=now)
+
+    def _next_interval(self, state: FeedPollState) -> float:
+        if state.item_rate is None:
+            interval = state.interval
+        elif state.item_rate <= 0:
+            # Nothing new: stretch the interval gradually rather than jumping
+            interval = state.interval * 1.5
+        else:
+            interval = self.target_items / state.item_rate
+
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        if state.ttl:
+            interval = max(interval, state.ttl * 60)
+        return interval
+
+    @staticmethod
+    def _apply_skip_hours(state: FeedPollState, due: float) -> float:
+        """Push ``due`` past any hours the publisher asked us to skip"""
+        if not state.skip_hours or len(state.skip_hours) >= 24:
+            return due
+        for _ in range(24):
+            hour = datetime.fromtimestamp(due, timezone.utc).hour
+            if hour not in state.skip_hours:
+                break
+            due = (due // 3600 + 1) * 3600
+        return due
+
+    def status(self) -> List[Dict]:
+        with self._lock:
+            return [state.to_dict() for state in self.states.values()]
@@ -0,0 +1,122 @@
+"""
+Incremental RSS/Atom entry reader built on lxml.iterparse
+
+feedparser materializes the whole document and every entry before the
+scraper keeps the first few. This reader yields entries as their closing
+tags stream in and stops as soon as the caller has enough, so the size of
+a publisher's feed no longer matters.
+"""
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from io import BytesIO
+from typing import Callable, Iterator, Optional
+
+from feedparser import FeedParserDict
+from lxml import etree
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+RSS1 = '{http://purl.org/rss/1.0/}'
+DC = '{http://purl.org/dc/elements/1.1/}'
+CONTENT = '{http://purl.org/rss/1.0/modules/content/}'
+
+ENTRY_TAGS = ('item', f'{RSS1}item', f'{ATOM}entry')
+
+
+def _parse_date(value: Optional[str]):
+    """UTC struct_time like feedparser's ``*_parsed`` fields, or None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).timetuple()
+
+
+def _text(element, *tags) -> Optional[str]:
+    for tag in tags:
+        child = element.find(tag)
+        if child is not None:
+            if child.get('type') == 'xhtml':
+                return ''.join(child.itertext()).strip()
+            if child.text:
+                return child.text.strip()
+    return None
+
+
+def _atom_link(element) -> Optional[str]:
+    fallback = None
+    for link in element.iterfind(f'{ATOM}link'):
+        rel = link.get('rel', 'alternate')
+        if rel == 'alternate':
+            return link.get('href')
+        fallback = fallback or link.get('href')
+    return fallback
+
+
+def _entry(element) -> FeedParserDict:
+    """Map an <item>/<entry> element onto feedparser's entry keys"""
+    entry = FeedParserDict()
+    is_atom = element.tag == f'{ATOM}entry'
+
+    entry['title'] = _text(element, 'title', f'{RSS1}title', f'{ATOM}title', f'{DC}title') or ''
+
+    link = _atom_link(element) if is_atom else _text(element, 'link', f'{RSS1}link')
+    if not link:
+        guid = element.find('guid')
+        if guid is not None and guid.get('isPermaLink', 'true') != 'false':
+            link = (guid.text or '').strip()
+    entry['link'] = link or ''
+
+    summary = _text(element, 'description', f'{RSS1}description',
+                    f'{ATOM}summary', f'{ATOM}content', f'{CONTENT}encoded')
+    if summary is not None:
+        entry['summary'] = summary
+
+    published = _parse_date(_text(element, 'pubDate', f'{ATOM}published', f'{DC}date'))
+    updated = _parse_date(_text(element, f'{ATOM}updated'))
+    if published:
+        entry['published_parsed'] = published
+    if updated:
+        entry['updated_parsed'] = updated
+    return entry
+
+
+def iter_feed_entries(content: bytes, limit: Optional[int] = None,
+                      stop_at: Optional[Callable[[FeedParserDict], bool]] = None
+                      ) -> Iterator[FeedParserDict]:
+    """Yield entries from an RSS 2.0, RSS 1.0 or Atom document in order.
+
+    Stops after ``limit`` entries, or at the first entry for which
+    ``stop_at(entry)`` is true (e.g. one that was already seen). Raises
+    ``lxml.etree.XMLSyntaxError`` on malformed input, so callers can fall
+    back to feedparser.
+    """
+    if limit is not None and limit <= 0:
+        return
+
+    count = 0
+    context = etree.iterparse(BytesIO(content), events=('end',), tag=ENTRY_TAGS,
+                              resolve_entities=False, no_network=True, huge_tree=True)
+    for _, element in context:
+        entry = _entry(element)
+
+        # Free the entry and everything before it as we go
+        element.clear()
+        parent = element.getparent()
+        while parent is not None and element.getprevious() is not None:
+            del parent[0]
+
+        if stop_at is not None and stop_at(entry):
+            return
+        yield entry
+        count += 1
+        if limit is not None and count >= limit:
+            return
@@ -102,7 +102,8 @@ def fix_database():
                 source VARCHAR(100),
                 published_date TIMESTAMP,
                 scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_featured BOOLEAN DEFAULT FALSE
+                is_featured BOOLEAN DEFAULT FALSE,
+                cluster_id VARCHAR(50)
             )
         """)
         
@@ -120,6 +121,37 @@ def fix_database():
             )
         """)
         
+        # Coins update_prices fetches (seeded with the defaults on first use)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tracked_assets (
+                id SERIAL PRIMARY KEY,
+                symbol VARCHAR(20) UNIQUE NOT NULL,
+                coingecko_id VARCHAR(100) UNIQUE NOT NULL,
+                name VARCHAR(50),
+                position INTEGER DEFAULT 0,
+                active BOOLEAN DEFAULT TRUE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Hourly/daily OHLC rollups of price_data (see price_retention.py)
+        for table in ('price_ohlc_1h', 'price_ohlc_1d'):
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    id SERIAL PRIMARY KEY,
+                    symbol VARCHAR(20) NOT NULL,
+                    bucket TIMESTAMP NOT NULL,
+                    open FLOAT,
+                    high FLOAT,
+                    low FLOAT,
+                    close FLOAT,
+                    market_cap BIGINT,
+                    volume_24h BIGINT,
+                    samples INTEGER DEFAULT 0,
+                    CONSTRAINT uq_{table}_symbol_bucket UNIQUE (symbol, bucket)
+                )
+            """)
+        
         # Site settings table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS site_settings (
@@ -136,6 +168,7 @@ def fix_database():
         # Create indexes
         print("\nCreating indexes...")
         cursor.execute("CREATE INDEX idx_news_published ON news_items(published_date DESC)")
+        cursor.execute("CREATE INDEX idx_news_cluster ON news_items(cluster_id)")
         cursor.execute("CREATE INDEX idx_articles_published ON articles(published, published_at DESC)")
         cursor.execute("CREATE INDEX idx_price_symbol ON price_data(symbol, timestamp DESC)")
         print("✓ Indexes created")
@@ -0,0 +1,117 @@
+"""
+Jinja fragment cache for expensive template blocks
+
+Wrap an expensive block of a template in a ``cache`` tag::
+
+    {% cache 'price-widget', 300, 'prices' %}
+        ...
+    {% endcache %}
+
+The arguments are the fragment name, its TTL in seconds, and the data
+versions it shows (see DataVersions). A rendered fragment is reused until
+one of those versions moves or the TTL runs out. To cache one copy per
+page or per parameter, build the name from it, e.g.
+``'news-' ~ page``.
+
+Fragments must not depend on who is looking at them; per-user parts of
+a page stay outside the tag. Hit and miss counts and render time are
+kept per fragment name, so the hit rate shows whether a fragment is
+worth caching.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+
+class FragmentCache:
+    """Rendered fragments keyed by name and data versions, LRU-bounded"""
+
+    def __init__(self, versions: Callable[[Iterable[str]], Dict[str, int]],
+                 max_entries: int = 256):
+        self.versions = versions
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _record(self, name: str, hit: bool, render_seconds: float = 0.0):
+        with self._lock:
+            stats = self._stats.setdefault(name, {'hits': 0, 'misses': 0, 'render_seconds': 0.0})
+            stats['hits' if hit else 'misses'] += 1
+            stats['render_seconds'] += render_seconds
+
+    def render(self, name: str, ttl: float, depends: Iterable[str], caller: Callable[[], str]) -> str:
+        versions = self.versions(depends) if depends else {}
+        key = (name, tuple(sorted(versions.items())))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                output = entry[1]
+            else:
+                output = None
+        if output is not None:
+            self._record(name, True)
+            return output
+
+        started = time.perf_counter()
+        output = caller()
+        self._record(name, False, time.perf_counter() - started)
+        with self._lock:
+            self._entries[key] = (now + ttl, output)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return output
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+            entries = len(self._entries)
+        for values in stats.values():
+            renders = values['misses']
+            lookups = values['hits'] + renders
+            values['hit_rate'] = round(values['hits'] / lookups, 3) if lookups else None
+            values['avg_render_ms'] = round(values.pop('render_seconds') / renders * 1000, 3) \
+                if renders else None
+        return {'entries': entries, 'fragments': stats}
+
+
+class FragmentCacheExtension(Extension):
+    """``{% cache name, ttl, version_name, ... %}...{% endcache %}``"""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        if len(args) < 2:
+            parser.fail('cache needs a fragment name and a ttl', lineno)
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(args)]),
+                               [], [], body).set_lineno(lineno)
+
+    def _render(self, args, caller):
+        name, ttl, *depends = args
+        cache = getattr(self.environment, 'fragment_cache', None)
+        if cache is None:
+            return caller()
+        return cache.render(str(name), float(ttl), depends, caller)
+
+
+def init_fragment_cache(app, cache: FragmentCache):
+    """Enable the ``cache`` tag in ``app``'s templates"""
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache = cache
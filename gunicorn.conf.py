@@ -0,0 +1,29 @@
+"""
+Gunicorn settings, read automatically when gunicorn starts in this directory
+
+Live price streams are served by a separate process on gevent workers
+(price_stream_server.py, gunicorn_stream.conf.py). The app's own
+/api/prices/stream route is only a fallback: each of its streams holds a
+thread, so app.py caps them per worker below GUNICORN_THREADS (see
+PRICE_STREAM_MAX_CLIENTS), which leaves threads free for page requests.
+
+Several workers are safe: the scheduled news, price and retention jobs
+run only in the worker holding SCHEDULER_LOCK_PATH (see
+claim_shared_jobs in app.py). preload_app must stay off, so each worker
+starts its own scheduler thread after the fork.
+
+Deploy by migrating and precompressing before (re)starting gunicorn:
+
+    flask --app app migrate-news-clusters
+    flask --app app compress-static
+"""
+
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+preload_app = False
+timeout = 60
+keepalive = 5
@@ -0,0 +1,18 @@
+"""
+Gunicorn settings for price_stream_server.py
+
+    gunicorn -c gunicorn_stream.conf.py price_stream_server:app
+
+One gevent worker holds every open price stream as a greenlet. A second
+worker only helps past one CPU, as each has its own STREAM_MAX_CLIENTS.
+"""
+
+import os
+
+bind = os.environ.get('STREAM_BIND', '0.0.0.0:8001')
+workers = int(os.environ.get('STREAM_WORKERS', '1'))
+worker_class = 'gevent'
+# Room for every stream plus the occasional health check
+worker_connections = int(os.environ.get('STREAM_MAX_CLIENTS', '1000')) + 50
+# Streams stay open for minutes; the worker heartbeat is separate from that
+timeout = 60
@@ -0,0 +1,150 @@
+"""
+Materialized homepage model
+
+The homepage shows the same three sections to every visitor: the latest
+news stories, the latest published articles and the price widget. The
+HomepageModel keeps them in memory as plain data. Each section records
+the data versions (see DataVersions) it was built from.
+
+update_news, update_prices and article saves rebuild their own section
+immediately in the worker that made the change. Other workers notice the
+version move on their next request and rebuild just that section. A
+homepage request therefore touches the database only right after its
+data changed, never on the steady-state path.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import joinedload
+
+from models import db, Article, NewsItem
+
+# section: data versions it is built from
+SECTIONS = {
+    'news': ('news', 'news_generation'),
+    'articles': ('articles', 'users'),
+    'prices': ('prices',),
+}
+
+# A failed rebuild keeps the previous data and is retried after this long
+RETRY_SECONDS = 30
+
+
+def load_news(limit: int = 15) -> List[Dict]:
+    return [{
+        'id': item.id,
+        'title': item.title,
+        'url': item.url,
+        'summary': item.summary or '',
+        'source': item.source,
+        'published_date': item.published_date,
+        'scraped_at': item.scraped_at,
+    } for item in NewsItem.latest_stories(limit)]
+
+
+def load_articles(limit: int = 5) -> List[Dict]:
+    articles = Article.query.options(joinedload(Article.author)).filter_by(
+        published=True).order_by(Article.published_at.desc()).limit(limit).all()
+    return [{
+        'title': article.title,
+        'slug': article.slug,
+        'summary': article.summary,
+        'views': article.views,
+        'published_at': article.published_at,
+        'author': {'username': article.author.username},
+    } for article in articles]
+
+
+def _jsonable(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+class HomepageModel:
+    """Homepage sections kept in memory and rebuilt one at a time"""
+
+    def __init__(self, versions: Callable[[Iterable[str]], Dict[str, int]],
+                 loaders: Dict[str, Callable[[], object]]):
+        self.versions = versions
+        self.loaders = loaders
+        # Serializes rebuilds; held while a loader queries the database
+        self._lock = threading.Lock()
+        # Held only to swap or read the data together with its versions
+        self._state_lock = threading.Lock()
+        self._sections = {name: [] if name != 'prices' else {} for name in SECTIONS}
+        self._built_versions = {}
+        self._retry_at = {}
+        self.built_at = {}
+        self.rebuilds = {name: 0 for name in SECTIONS}
+
+    def _current(self) -> Dict[str, int]:
+        names = {name for depends in SECTIONS.values() for name in depends}
+        return self.versions(sorted(names))
+
+    def _is_stale(self, section: str, current: Dict[str, int]) -> bool:
+        built = self._built_versions.get(section)
+        if built == {name: current[name] for name in SECTIONS[section]}:
+            return False
+        return self._retry_at.get(section, 0) <= time.monotonic()
+
+    def refresh(self, section: str, current: Optional[Dict[str, int]] = None, force: bool = True):
+        """Rebuild one section now, e.g. right after its data changed"""
+        # Versions are read before loading, so a change made during the
+        # load is picked up by the next request instead of being lost
+        current = current or self._current()
+        with self._lock:
+            # Another request may have rebuilt it while this one waited
+            if not force and not self._is_stale(section, current):
+                return
+            try:
+                data = self.loaders[section]()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error rebuilding homepage {section}: {e}")
+                self._retry_at[section] = time.monotonic() + RETRY_SECONDS
+                return
+            built = {name: current[name] for name in SECTIONS[section]}
+            # Swapped whole and together, so readers never see a half-built
+            # homepage or data paired with versions it was not built from
+            with self._state_lock:
+                self._sections = dict(self._sections, **{section: data})
+                self._built_versions = dict(self._built_versions, **{section: built})
+                self.built_at = dict(self.built_at, **{section: datetime.utcnow()})
+            self._retry_at.pop(section, None)
+            self.rebuilds[section] += 1
+
+    def get(self) -> Dict:
+        """The current sections, rebuilding only those whose data moved.
+
+        ``versions`` are the data versions the returned sections were
+        built from. They lag the current ones while a failed rebuild
+        waits for its retry.
+        """
+        current = self._current()
+        for section in SECTIONS:
+            if self._is_stale(section, current):
+                self.refresh(section, current, force=False)
+        with self._state_lock:
+            sections, built, built_at = self._sections, self._built_versions, self.built_at
+        versions = {name: version for section_versions in built.values()
+                    for name, version in section_versions.items()}
+        return dict(sections, versions=versions, built_at=built_at)
+
+    @staticmethod
+    def etag(home: Dict) -> str:
+        """Validator for a ``get()`` result; 'x' marks a section never built"""
+        names = sorted({name for depends in SECTIONS.values() for name in depends})
+        return 'home-' + '-'.join(str(home['versions'].get(name, 'x')) for name in names)
+
+    @staticmethod
+    def as_json(home: Dict) -> Dict:
+        """A ``get()`` result with its dates as ISO strings"""
+        return _jsonable(home)
@@ -0,0 +1,139 @@
+"""
+Whitespace-safe HTML minifier for rendered pages
+
+Pages are scanned once from left to right. Tags are copied verbatim, and
+comments are dropped. In text, each run of whitespace becomes one space;
+a whitespace-only run next to a block-level tag is dropped, because
+browsers would not render it. Content that depends on its whitespace is
+copied untouched:
+
+* ``<pre>`` and ``<textarea>``
+* ``<script>`` and ``<style>``
+* any element whose inline style sets ``white-space: pre`` or one of its
+  variants (the article body)
+
+The regex this replaces removed whitespace between every pair of tags,
+including inside those elements.
+"""
+
+import re
+
+_COMMENT_RE = re.compile(r'<!--.*?(?:-->|\Z)', re.DOTALL)
+_DECLARATION_RE = re.compile(r'<[!?][^>]*>?')
+_TAG_RE = re.compile(
+    r'<(/?)([a-zA-Z][^\s/>]*)(?:[^>"\']|"[^"]*"|\'[^\']*\')*>')
+_PRE_STYLE_RE = re.compile(r'white-space\s*:\s*(?:pre|break-spaces)', re.IGNORECASE)
+
+# Kept byte for byte up to their end tag
+_RAW_TEXT_ELEMENTS = ('script', 'style', 'textarea')
+_RAW_TEXT_END_RE = {
+    name: re.compile(rf'</{name}\s*>', re.IGNORECASE) for name in _RAW_TEXT_ELEMENTS
+}
+_PREFORMATTED_ELEMENTS = {'pre'}
+
+# Whitespace next to these tags never renders
+_BLOCK_ELEMENTS = {
+    'address', 'article', 'aside', 'base', 'blockquote', 'body', 'br', 'dd', 'details',
+    'dialog', 'div', 'dl', 'dt', 'fieldset', 'figcaption', 'figure', 'footer', 'form',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'head', 'header', 'hr', 'html', 'li', 'link',
+    'main', 'meta', 'nav', 'noscript', 'ol', 'option', 'p', 'pre', 'script', 'section',
+    'style', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'title', 'tr', 'ul',
+}
+
+
+def minify_html(html: str) -> str:
+    """``html`` with insignificant whitespace and comments removed"""
+    parts = []
+    pos = 0
+    end = len(html)
+    # Whitespace seen since the last output, emitted only before inline content
+    pending_space = False
+    after_block = True
+    # Name and nesting depth of the preformatted element being copied
+    preserve = None
+    depth = 0
+
+    while pos < end:
+        lt = html.find('<', pos)
+        if lt == -1:
+            lt = end
+
+        if lt > pos:
+            text = html[pos:lt]
+            if preserve:
+                parts.append(text)
+            else:
+                core = ' '.join(text.split())
+                if core:
+                    if (pending_space or text[0].isspace()) and not after_block:
+                        parts.append(' ')
+                    parts.append(core)
+                    pending_space = text[-1].isspace()
+                    after_block = False
+                else:
+                    pending_space = True
+        if lt >= end:
+            break
+
+        if html.startswith('<!--', lt):
+            match = _COMMENT_RE.match(html, lt)
+            # Conditional comments are markup for old IE, not commentary
+            if preserve or html.startswith('<!--[if', lt):
+                parts.append(match.group(0))
+            pos = match.end()
+            continue
+
+        if html.startswith(('<!', '<?'), lt):
+            match = _DECLARATION_RE.match(html, lt)
+            parts.append(match.group(0))
+            pos = match.end()
+            continue
+
+        match = _TAG_RE.match(html, lt)
+        if not match:
+            # A bare '<' is just text
+            if preserve:
+                parts.append('<')
+            else:
+                if pending_space and not after_block:
+                    parts.append(' ')
+                parts.append('<')
+                pending_space = after_block = False
+            pos = lt + 1
+            continue
+
+        tag = match.group(0)
+        closing = bool(match.group(1))
+        name = match.group(2).lower()
+        pos = match.end()
+
+        if preserve:
+            parts.append(tag)
+            if name == preserve:
+                depth += -1 if closing else 1
+                if depth == 0:
+                    preserve = None
+                    after_block = name in _BLOCK_ELEMENTS
+                    pending_space = False
+            continue
+
+        block = name in _BLOCK_ELEMENTS
+        if pending_space and not block and not after_block:
+            parts.append(' ')
+        pending_space = False
+        after_block = block
+        parts.append(tag)
+        if closing:
+            continue
+
+        if name in _RAW_TEXT_ELEMENTS:
+            end_match = _RAW_TEXT_END_RE[name].search(html, pos)
+            stop = end_match.end() if end_match else end
+            parts.append(html[pos:stop])
+            pos = stop
+        elif name in _PREFORMATTED_ELEMENTS or _PRE_STYLE_RE.search(tag):
+            if not tag.endswith('/>'):
+                preserve = name
+                depth = 1
+
+    return ''.join(parts)
@@ -5,8 +5,8 @@ Run this after setting up PostgreSQL
 """
 
 from crypto_news_scraper import SimpleCryptoRSSFeedScraper
-from models import User, Article, NewsItem, PriceData, SiteSettings
-from app import app, db
+from models import User, Article, NewsItem, SiteSettings, TrackedAsset
+from app import app, db, update_prices
 import os
 import sys
 from datetime import datetime
@@ -20,6 +20,8 @@ def init_database():
     with app.app_context():
         print("Creating database tables...")
         db.create_all()
+        # create_all skips tables that exist, so add columns they predate
+        NewsItem.migrate_cluster_column()
         print("✓ Database tables created")
 
         # Check if already initialized
@@ -107,47 +109,10 @@ Get started by exploring the latest news or creating your own account to contrib
         except Exception as e:
             print(f"⚠️  Could not fetch initial news: {e}")
 
-        # Fetch initial price data
+        # Track the default coins and fetch initial price data
         print("\nFetching initial price data...")
-        try:
-            import requests
-            url = "https://api.coingecko.com/api/v3/simple/price"
-            params = {
-                'ids': 'bitcoin,ethereum,binancecoin,ripple,cardano,solana,polkadot,dogecoin',
-                'vs_currencies': 'usd',
-                'include_24hr_change': 'true',
-                'include_market_cap': 'true',
-                'include_24hr_vol': 'true'
-            }
-            response = requests.get(url, params=params, verify=False)
-            data = response.json()
-
-            crypto_names = {
-                'bitcoin': 'BTC',
-                'ethereum': 'ETH',
-                'binancecoin': 'BNB',
-                'ripple': 'XRP',
-                'cardano': 'ADA',
-                'solana': 'SOL',
-                'polkadot': 'DOT',
-                'dogecoin': 'DOGE'
-            }
-
-            for crypto_id, info in data.items():
-                price_data = PriceData(
-                    symbol=crypto_names.get(crypto_id, crypto_id).upper(),
-                    name=crypto_names.get(crypto_id, crypto_id),
-                    price_usd=info.get('usd', 0),
-                    change_24h=info.get('usd_24h_change', 0),
-                    market_cap=info.get('usd_market_cap', 0),
-                    volume_24h=info.get('usd_24h_vol', 0)
-                )
-                db.session.add(price_data)
-
-            db.session.commit()
-            print(f"✓ Price data for {len(data)} cryptocurrencies imported")
-        except Exception as e:
-            print(f"⚠️  Could not fetch initial prices: {e}")
+        TrackedAsset.seed_defaults()
+        update_prices()
 
         print("\n" + "="*50)
         print("✅ Database initialization complete!")
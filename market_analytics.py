@@ -0,0 +1,211 @@
+"""
+Market indicators over the stored price history
+
+The close prices of every tracked coin are loaded with one query per
+retention tier into a symbol x time NumPy matrix on a regular grid, and
+all indicators are computed on whole arrays: rolling volatility, SMA,
+EMA, the correlation matrix of returns and drawdowns. Results are cached
+per price snapshot version, i.e. computed once per refresh cycle.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from price_retention import query_closes
+
+# range: (lookback, grid step, retention tier, indicator window in steps)
+RANGES = {
+    '7d': (timedelta(days=7), timedelta(hours=1), '1h', 24),
+    '30d': (timedelta(days=30), timedelta(hours=1), '1h', 24),
+    '90d': (timedelta(days=90), timedelta(hours=1), '1h', 24),
+    '1y': (timedelta(days=365), timedelta(days=1), '1d', 30),
+}
+DEFAULT_RANGE = '30d'
+
+# Crypto trades around the clock
+STEPS_PER_YEAR = {timedelta(hours=1): 24 * 365, timedelta(days=1): 365}
+
+
+def build_matrix(rows: List[Tuple], symbols: List[str], start: datetime,
+                 step: timedelta, steps: int) -> np.ndarray:
+    """Pivot ``(symbol, time, close)`` rows onto a symbols x steps grid.
+
+    The last close in each step wins; steps with no data carry the
+    previous close forward, and leading gaps stay NaN.
+    """
+    matrix = np.full((len(symbols), steps), np.nan)
+    if not rows:
+        return matrix
+
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    row_symbols, times, closes = zip(*rows)
+    sym_idx = np.fromiter((index[s] for s in row_symbols), dtype=np.int64, count=len(rows))
+    seconds = (np.array(times, dtype='datetime64[s]') -
+               np.datetime64(start, 's')).astype(np.int64)
+    time_idx = np.clip(seconds // int(step.total_seconds()), 0, steps - 1)
+    # Rows are time-ordered, so plain fancy assignment keeps the last close
+    matrix[sym_idx, time_idx] = np.array(closes, dtype=np.float64)
+    return forward_fill(matrix)
+
+
+def forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """Carry the last finite value forward along each row"""
+    valid = np.isfinite(matrix)
+    positions = np.where(valid, np.arange(matrix.shape[1]), 0)
+    np.maximum.accumulate(positions, axis=1, out=positions)
+    filled = matrix[np.arange(matrix.shape[0])[:, None], positions]
+    # Positions before a row's first value point at column 0, which may be NaN
+    filled[~np.logical_or.accumulate(valid, axis=1)] = np.nan
+    return filled
+
+
+def rolling_mean(matrix: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean; the first ``window - 1`` columns are NaN"""
+    out = np.full(matrix.shape, np.nan)
+    if matrix.shape[1] >= window:
+        out[:, window - 1:] = sliding_window_view(matrix, window, axis=1).mean(axis=-1)
+    return out
+
+
+def rolling_std(matrix: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(matrix.shape, np.nan)
+    if matrix.shape[1] >= window:
+        out[:, window - 1:] = sliding_window_view(matrix, window, axis=1).std(axis=-1, ddof=1)
+    return out
+
+
+def ema(matrix: np.ndarray, span: int) -> np.ndarray:
+    """Exponential moving average, stepping through time for all symbols at once"""
+    alpha = 2.0 / (span + 1)
+    out = np.empty_like(matrix)
+    current = matrix[:, 0].copy()
+    for t in range(matrix.shape[1]):
+        column = matrix[:, t]
+        current = np.where(np.isnan(current), column,
+                           np.where(np.isnan(column), current,
+                                    alpha * column + (1 - alpha) * current))
+        out[:, t] = current
+    return out
+
+
+def drawdowns(matrix: np.ndarray) -> np.ndarray:
+    """Fractional distance below the running peak (0 at a new high)"""
+    peaks = np.fmax.accumulate(matrix, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return matrix / peaks - 1
+
+
+def correlations(returns: np.ndarray, min_periods: int = 3) -> np.ndarray:
+    """Pairwise Pearson correlation of returns, each pair over the steps both have.
+
+    Done as a handful of matrix products over zero-filled returns and their
+    validity mask, so coins with short histories don't blank the matrix.
+    """
+    mask = np.isfinite(returns).astype(np.float64)
+    x = np.where(mask > 0, returns, 0.0)
+    n = mask @ mask.T
+    sum_x = x @ mask.T
+    sum_y = sum_x.T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = x @ x.T - sum_x * sum_y / n
+        var_x = (x * x) @ mask.T - sum_x ** 2 / n
+        corr = cov / np.sqrt(var_x * var_x.T)
+    corr[n < min_periods] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _last_finite(matrix: np.ndarray) -> np.ndarray:
+    filled = forward_fill(matrix)
+    return filled[:, -1] if filled.shape[1] else np.full(matrix.shape[0], np.nan)
+
+
+def _clean(value, digits: int = 6):
+    """JSON-friendly float: NaN/inf become None"""
+    value = float(value)
+    return round(value, digits) if np.isfinite(value) else None
+
+
+def compute_indicators(symbols: List[str], range_name: str = DEFAULT_RANGE,
+                       end: Optional[datetime] = None) -> Dict:
+    """Indicators for ``symbols`` over ``range_name``"""
+    if range_name not in RANGES:
+        raise ValueError(f"range must be one of {', '.join(RANGES)}")
+    lookback, step, resolution, window = RANGES[range_name]
+    symbols = [s.upper() for s in symbols]
+
+    end = end or datetime.utcnow()
+    steps = int(lookback / step)
+    start = end - steps * step
+    rows = query_closes(symbols, start, end, resolution)
+    prices = build_matrix(rows, symbols, start, step, steps)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = np.diff(np.log(prices), axis=1)
+        first = np.take_along_axis(
+            prices, np.argmax(np.isfinite(prices), axis=1)[:, None], axis=1)[:, 0]
+        last = _last_finite(prices)
+        total_return = last / first - 1
+
+    volatility = rolling_std(returns, window) * np.sqrt(STEPS_PER_YEAR[step])
+    sma = rolling_mean(prices, window)
+    ema_values = ema(prices, window)
+    drawdown = drawdowns(prices)
+    max_drawdown = np.min(np.where(np.isfinite(drawdown), drawdown, np.inf), axis=1)
+    corr = correlations(returns)
+    last_volatility = _last_finite(volatility)
+    last_drawdown = _last_finite(drawdown)
+
+    indicators = {}
+    for i, symbol in enumerate(symbols):
+        indicators[symbol.lower()] = {
+            'price': _clean(last[i]),
+            'return': _clean(total_return[i]),
+            'volatility': _clean(last_volatility[i]),
+            'sma': _clean(sma[i, -1]) if steps else None,
+            'ema': _clean(ema_values[i, -1]) if steps else None,
+            'drawdown': _clean(last_drawdown[i]),
+            'max_drawdown': _clean(max_drawdown[i]),
+        }
+
+    return {
+        'range': range_name,
+        'resolution': resolution,
+        'window': window,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'symbols': [s.lower() for s in symbols],
+        'indicators': indicators,
+        'correlation': [[_clean(value, 4) for value in row] for row in corr],
+    }
+
+
+class AnalyticsCache:
+    """Indicators computed once per price snapshot version"""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version: int, symbols: List[str], range_name: str = DEFAULT_RANGE) -> Dict:
+        key = (version, tuple(symbols), range_name)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        result = compute_indicators(symbols, range_name)
+        result['version'] = version
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+
+analytics_cache = AnalyticsCache()
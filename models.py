@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
@@ -53,7 +54,7 @@ class NewsItem(db.Model):
     __tablename__ = 'news_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    external_id = db.Column(db.String(50), unique=True)  # ID from scraper
+    external_id = db.Column(db.String(50), unique=True)  # Canonical URL fingerprint from scraper
     title = db.Column(db.String(300), nullable=False)
     url = db.Column(db.String(500), nullable=False)
     summary = db.Column(db.Text)
@@ -61,10 +62,12 @@ class NewsItem(db.Model):
     published_date = db.Column(db.DateTime)
     scraped_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_featured = db.Column(db.Boolean, default=False)
+    cluster_id = db.Column(db.String(50), index=True)  # Same story across sources
     
     def to_dict(self):
         return {
             'id': self.external_id,
+            'cluster_id': self.cluster_id,
             'title': self.title,
             'url': self.url,
             'summary': self.summary,
@@ -73,6 +76,123 @@ class NewsItem(db.Model):
             'scraped_at': self.scraped_at.isoformat()
         }
     
+    @classmethod
+    def latest_stories(cls, limit=15, since_id=None):
+        """Newest news items, one per story cluster (only ids above ``since_id``)"""
+        from news_clustering import one_per_story
+        
+        query = cls.query
+        if since_id is not None:
+            query = query.filter(cls.id > since_id)
+        # Over-fetch so collapsing syndicated copies still fills the page
+        items = query.order_by(cls.published_date.desc()).limit(limit * 3).all()
+        return one_per_story(items, limit)
+    
+    @classmethod
+    def bulk_ingest(cls, articles, clusterer=None):
+        """Insert scraped articles that aren't stored yet.
+        
+        Dedupes the whole batch against external_id with one query and
+        inserts the new rows with a single multi-row INSERT ... ON CONFLICT
+        DO NOTHING, so the number of round-trips doesn't grow with the feed
+        count. With a ``clusterer`` each new row also gets a cluster_id;
+        stories whose rows end up not stored are taken back out of its
+        index. Returns a dict with ``inserted`` and ``skipped`` counts.
+        """
+        batch = {}
+        for article in articles:
+            if article.get('id') and article['id'] not in batch:
+                batch[article['id']] = article
+        
+        if not batch:
+            return {'inserted': 0, 'skipped': len(articles)}
+        
+        existing = {
+            external_id for (external_id,) in db.session.query(cls.external_id)
+            .filter(cls.external_id.in_(list(batch)))
+        }
+        
+        now = datetime.utcnow()
+        rows = []
+        for external_id, article in batch.items():
+            if external_id in existing:
+                continue
+            try:
+                published = datetime.fromisoformat(article['published'])
+            except (KeyError, TypeError, ValueError):
+                published = now
+            rows.append({
+                'external_id': external_id,
+                'title': article['title'][:300],
+                'url': article['url'][:500],
+                'summary': article.get('summary', ''),
+                'source': (article.get('source') or 'Unknown')[:100],
+                'published_date': published,
+                'scraped_at': now,
+                'is_featured': False,
+                'cluster_id': clusterer.assign(
+                    external_id, article['title'], article.get('summary', ''))
+                if clusterer is not None else external_id,
+            })
+        
+        inserted = 0
+        if rows:
+            keys = [row['external_id'] for row in rows]
+            dialect = db.session.get_bind().dialect.name
+            if dialect == 'postgresql':
+                stmt = postgresql.insert(cls.__table__).values(rows) \
+                    .on_conflict_do_nothing(index_elements=['external_id'])
+            elif dialect == 'sqlite':
+                stmt = sqlite.insert(cls.__table__).values(rows) \
+                    .on_conflict_do_nothing(index_elements=['external_id'])
+            else:
+                stmt = cls.__table__.insert().values(rows)
+            try:
+                if dialect in ('postgresql', 'sqlite'):
+                    # Rows another worker stored first are skipped by the conflict clause
+                    stored = set(db.session.execute(
+                        stmt.returning(cls.__table__.c.external_id)).scalars())
+                else:
+                    db.session.execute(stmt)
+                    stored = set(keys)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                if clusterer is not None:
+                    clusterer.discard(keys)
+                raise
+            inserted = len(stored)
+            if clusterer is not None:
+                clusterer.discard(key for key in keys if key not in stored)
+        
+        return {'inserted': inserted, 'skipped': len(articles) - inserted}
+
+    @classmethod
+    def migrate_cluster_column(cls):
+        """Add cluster_id and its index to a news_items table created before them.
+
+        Safe to run on every deploy: each step is skipped when already done.
+        Rows stored before clustering become their own one-story cluster.
+        Returns True if the column had to be added.
+        """
+        table = cls.__tablename__
+        engine = db.engine
+        columns = {column['name'] for column in db.inspect(engine).get_columns(table)}
+        added = 'cluster_id' not in columns
+        with engine.begin() as conn:
+            if added:
+                if engine.dialect.name == 'postgresql':
+                    # IF NOT EXISTS covers two deploys migrating at once
+                    conn.execute(db.text(
+                        f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS cluster_id VARCHAR(50)'))
+                else:
+                    conn.execute(db.text(f'ALTER TABLE {table} ADD COLUMN cluster_id VARCHAR(50)'))
+            conn.execute(db.text(
+                f'CREATE INDEX IF NOT EXISTS ix_{table}_cluster_id ON {table} (cluster_id)'))
+            conn.execute(db.text(
+                f'UPDATE {table} SET cluster_id = external_id WHERE cluster_id IS NULL'))
+        return added
+
     def __repr__(self):
         return f'<NewsItem {self.title[:50]}...>'
 
@@ -88,10 +208,115 @@ class PriceData(db.Model):
     market_cap = db.Column(db.BigInteger)
     volume_24h = db.Column(db.BigInteger)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Created by fix_database_final.py; serves every "latest per symbol" lookup
+    __table_args__ = (
+        db.Index('idx_price_symbol', 'symbol', timestamp.desc()),
+    )
     
     def __repr__(self):
         return f'<PriceData {self.symbol} ${self.price_usd}>'
 
+    @classmethod
+    def latest_for_symbols(cls, symbols):
+        """Latest row for each symbol, keyed by symbol, in one query.
+
+        Each symbol contributes a ``ORDER BY timestamp DESC LIMIT 1`` scalar
+        subquery, which is a single seek on idx_price_symbol on both
+        PostgreSQL and SQLite no matter how much history is stored.
+        """
+        symbols = [s.upper() for s in symbols]
+        if not symbols:
+            return {}
+
+        latest_ids = [
+            db.select(cls.id).where(cls.symbol == symbol)
+            .order_by(cls.timestamp.desc()).limit(1).scalar_subquery()
+            for symbol in symbols
+        ]
+        rows = cls.query.filter(cls.id.in_(latest_ids)).all()
+        return {row.symbol: row for row in rows}
+
+class TrackedAsset(db.Model):
+    """A coin whose price update_prices fetches and the price endpoints serve"""
+    __tablename__ = 'tracked_assets'
+
+    DEFAULTS = [
+        ('BTC', 'bitcoin', 'Bitcoin'),
+        ('ETH', 'ethereum', 'Ethereum'),
+        ('BNB', 'binancecoin', 'Binance Coin'),
+        ('XRP', 'ripple', 'Ripple'),
+        ('ADA', 'cardano', 'Cardano'),
+        ('SOL', 'solana', 'Solana'),
+        ('DOT', 'polkadot', 'Polkadot'),
+        ('DOGE', 'dogecoin', 'Dogecoin'),
+    ]
+
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String(20), unique=True, nullable=False)
+    coingecko_id = db.Column(db.String(100), unique=True, nullable=False)
+    name = db.Column(db.String(50))
+    position = db.Column(db.Integer, default=0)  # Display order
+    active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def seed_defaults(cls):
+        """Track the original eight coins if nothing is tracked yet"""
+        if cls.query.first() is None:
+            for position, (symbol, coingecko_id, name) in enumerate(cls.DEFAULTS):
+                db.session.add(cls(symbol=symbol, coingecko_id=coingecko_id,
+                                   name=name, position=position))
+            db.session.commit()
+
+    @classmethod
+    def active_assets(cls):
+        """Active assets in display order, seeding the defaults on first use"""
+        cls.seed_defaults()
+        return cls.query.filter_by(active=True).order_by(cls.position, cls.symbol).all()
+
+    def to_dict(self):
+        return {
+            'symbol': self.symbol,
+            'coingecko_id': self.coingecko_id,
+            'name': self.name,
+            'position': self.position,
+            'active': self.active
+        }
+
+    def __repr__(self):
+        return f'<TrackedAsset {self.symbol} ({self.coingecko_id})>'
+
+class PriceOHLCMixin:
+    """Columns shared by the rolled-up price_data tiers"""
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String(20), nullable=False)
+    bucket = db.Column(db.DateTime, nullable=False)  # Start of the period (UTC)
+    open = db.Column(db.Float)
+    high = db.Column(db.Float)
+    low = db.Column(db.Float)
+    close = db.Column(db.Float)
+    market_cap = db.Column(db.BigInteger)  # Last value seen in the period
+    volume_24h = db.Column(db.BigInteger)
+    samples = db.Column(db.Integer, default=0)
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.symbol} {self.bucket} ${self.close}>'
+
+class PriceOHLC1h(PriceOHLCMixin, db.Model):
+    """Hourly OHLC built from raw price_data ticks"""
+    __tablename__ = 'price_ohlc_1h'
+    __table_args__ = (
+        db.UniqueConstraint('symbol', 'bucket', name='uq_price_ohlc_1h_symbol_bucket'),
+    )
+
+class PriceOHLC1d(PriceOHLCMixin, db.Model):
+    """Daily OHLC built from the hourly rollup"""
+    __tablename__ = 'price_ohlc_1d'
+    __table_args__ = (
+        db.UniqueConstraint('symbol', 'bucket', name='uq_price_ohlc_1d_symbol_bucket'),
+    )
+
 class SiteSettings(db.Model):
     """Site configuration settings"""
     __tablename__ = 'site_settings'
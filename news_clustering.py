@@ -0,0 +1,166 @@
+"""
+Near-duplicate story detection across news sources
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+from typing import Iterable, List, Optional, Tuple
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Words that carry no signal about which story a headline is about
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'in',
+    'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'will',
+    'with'
+}
+
+
+def shingles(text: str, size: int = 2) -> List[str]:
+    """Word unigrams plus ``size``-word shingles of normalized ``text``"""
+    words = [w for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+    features = list(words)
+    features.extend(' '.join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return features
+
+
+def simhash(features: Iterable[str], bits: int = 64) -> int:
+    """Charikar SimHash of ``features``; similar inputs differ in few bits"""
+    weights = [0] * bits
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'),
+                                           digest_size=bits // 8).digest(), 'big')
+        for i in range(bits):
+            if h >> i & 1:
+                weights[i] += 1
+            else:
+                weights[i] -= 1
+
+    value = 0
+    for i, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << i
+    return value
+
+
+class StoryClusterer:
+    """Assign a cluster id to each incoming story.
+
+    SimHashes of title + summary shingles are kept in an in-memory LSH index
+    covering the last ``window`` seconds. The 64-bit hash is split into
+    ``bands`` bands, so any two hashes within ``max_distance`` bits share at
+    least one band exactly (as long as max_distance < bands) and only those
+    bucket neighbours need comparing.
+    """
+
+    def __init__(self, window: float = 48 * 3600, bits: int = 64, bands: int = 8,
+                 max_distance: int = 6):
+        if bits % bands:
+            raise ValueError('bits must be divisible by bands')
+        self.window = window
+        self.bits = bits
+        self.bands = bands
+        self.band_bits = bits // bands
+        self.max_distance = max_distance
+        self.warmed = False
+
+        self._lock = threading.Lock()
+        self._buckets = {}
+        # (added_at, key, hash, cluster_id) in insertion order, for expiry
+        self._entries = deque()
+
+    def _band_keys(self, value: int) -> List[Tuple[int, int]]:
+        mask = (1 << self.band_bits) - 1
+        return [(band, value >> (band * self.band_bits) & mask)
+                for band in range(self.bands)]
+
+    def _unindex(self, entry: Tuple):
+        for band_key in self._band_keys(entry[2]):
+            bucket = self._buckets.get(band_key)
+            if bucket is None:
+                continue
+            try:
+                bucket.remove(entry)
+            except ValueError:
+                pass
+            if not bucket:
+                del self._buckets[band_key]
+
+    def _expire(self, now: float):
+        cutoff = now - self.window
+        while self._entries and self._entries[0][0] < cutoff:
+            self._unindex(self._entries.popleft())
+
+    def fingerprint(self, title: str, summary: str = '') -> int:
+        return simhash(shingles(f'{title} {summary or ""}'), self.bits)
+
+    def assign(self, key: str, title: str, summary: str = '',
+               now: Optional[float] = None, cluster_id: Optional[str] = None) -> str:
+        """Return the cluster id for a story and add it to the index.
+
+        A story that matches nothing in the window starts its own cluster,
+        named after ``key``. Pass ``cluster_id`` to re-index a story whose
+        cluster is already known.
+        """
+        now = time.time() if now is None else now
+        value = self.fingerprint(title, summary)
+
+        with self._lock:
+            self._expire(now)
+
+            if cluster_id is None:
+                best = None
+                for band_key in self._band_keys(value):
+                    for entry in self._buckets.get(band_key, ()):
+                        distance = bin(entry[2] ^ value).count('1')
+                        if distance <= self.max_distance and (best is None or distance < best[0]):
+                            best = (distance, entry[3])
+                cluster_id = best[1] if best else key
+
+            entry = (now, key, value, cluster_id)
+            self._entries.append(entry)
+            for band_key in self._band_keys(value):
+                self._buckets.setdefault(band_key, []).append(entry)
+
+        return cluster_id
+
+    def discard(self, keys: Iterable[str]):
+        """Drop stories from the index, e.g. because their rows were not stored"""
+        keys = set(keys)
+        if not keys:
+            return
+        with self._lock:
+            kept = deque()
+            for entry in self._entries:
+                if entry[1] in keys:
+                    self._unindex(entry)
+                else:
+                    kept.append(entry)
+            self._entries = kept
+
+    def warm(self, stories: Iterable[Tuple[str, str, str, Optional[str], float]]):
+        """Load ``(key, title, summary, cluster_id, added_at)`` tuples, oldest first"""
+        for key, title, summary, cluster_id, added_at in stories:
+            self.assign(key, title, summary, now=added_at, cluster_id=cluster_id or key)
+        self.warmed = True
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def one_per_story(items: Iterable, limit: int) -> List:
+    """Keep the first item of each cluster, up to ``limit`` items"""
+    seen = set()
+    unique = []
+    for item in items:
+        cluster = getattr(item, 'cluster_id', None) or getattr(item, 'external_id', None) or id(item)
+        if cluster in seen:
+            continue
+        seen.add(cluster)
+        unique.append(item)
+        if len(unique) >= limit:
+            break
+    return unique
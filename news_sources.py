@@ -0,0 +1,391 @@
+"""
+Pluggable news source adapters for the scrapers
+
+Each adapter knows how to turn one source's raw response into article
+dicts. Adapters are registered by name and fetched together through
+FeedFetcher, so adding a source never lengthens the scrape cycle by more
+than its own fetch.
+"""
+
+import datetime
+import json
+import os
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import feedparser
+from lxml import etree
+
+from feed_fetcher import FeedFetcher, FeedResponse
+from feed_stream import iter_feed_entries
+from text_utils import html_to_text
+from url_utils import url_fingerprint
+
+SUMMARY_LENGTH = 200
+
+
+class SourceMetrics:
+    """Running fetch/parse counters for one source"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.bytes = 0
+        self.items = 0
+        self.total_latency = 0.0
+        self.last_latency = None
+        self.last_error = None
+
+    def record(self, response: FeedResponse, items: int = 0, error: Optional[str] = None):
+        with self._lock:
+            self.fetches += 1
+            self.bytes += len(response.content)
+            self.items += items
+            self.total_latency += response.elapsed
+            self.last_latency = response.elapsed
+            if response.not_modified:
+                self.not_modified += 1
+            if error:
+                self.errors += 1
+                self.last_error = error
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'fetches': self.fetches,
+                'errors': self.errors,
+                'not_modified': self.not_modified,
+                'bytes': self.bytes,
+                'items': self.items,
+                'avg_latency': round(self.total_latency / self.fetches, 3) if self.fetches else None,
+                'last_latency': round(self.last_latency, 3) if self.last_latency is not None else None,
+                'last_error': self.last_error
+            }
+
+
+def normalize_published(value) -> str:
+    """ISO timestamp (naive UTC) from a struct_time, ISO string or RFC 822 date"""
+    if value:
+        try:
+            if hasattr(value, 'tm_year'):
+                return datetime.datetime(*value[:6]).isoformat()
+            text = str(value).strip()
+            try:
+                parsed = datetime.datetime.fromisoformat(text.replace('Z', '+00:00'))
+            except ValueError:
+                parsed = parsedate_to_datetime(text)
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+            return parsed.isoformat()
+        except (TypeError, ValueError, IndexError):
+            pass
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None).isoformat()
+
+
+class SourceAdapter:
+    """Base class for a news source"""
+
+    kind = 'base'
+
+    def __init__(self, name: str, url: str, limit: int = 5, core: bool = False):
+        self.name = name
+        self.url = url
+        self.limit = limit
+        # Core sources are the reliable subset SimpleCryptoRSSFeedScraper polls
+        self.core = core
+        self.metrics = SourceMetrics()
+
+    def parse(self, response: FeedResponse) -> List[Dict]:
+        """Turn a successful response into article dicts"""
+        raise NotImplementedError
+
+    def make_article(self, title: str, url: str, summary: str = '',
+                     published=None, source: Optional[str] = None) -> Dict:
+        title = title or 'No title'
+        return {
+            'id': url_fingerprint(url),
+            'title': title,
+            'url': url,
+            'summary': summary if summary else title[:SUMMARY_LENGTH],
+            'source': source or self.name,
+            'published': normalize_published(published),
+            'scraped_at': datetime.datetime.now().isoformat()
+        }
+
+    def handle(self, response: FeedResponse) -> List[Dict]:
+        """Parse ``response`` and record metrics; never raises"""
+        if response.not_modified:
+            self.metrics.record(response)
+            return []
+        if not response.ok:
+            error = response.error or f'HTTP {response.status}'
+            self.metrics.record(response, error=error)
+            print(f"  {self.name}: {error}")
+            return []
+
+        try:
+            articles = self.parse(response)
+        except Exception as e:
+            # Not recorded as seen, so the next poll parses it again
+            response.validators = None
+            response.seen_ids = []
+            self.metrics.record(response, error=f'parse error: {e}')
+            print(f"  {self.name}: parse error: {e}")
+            return []
+
+        self.metrics.record(response, items=len(articles))
+        print(f"  {self.name}: found {len(articles)} articles")
+        response.seen_ids = [article['id'] for article in articles]
+        return articles
+
+    def remember(self, ids: List[str]):
+        """Mark stored items as seen; adapters that stop early override this"""
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.name}>'
+
+
+class RSSAdapter(SourceAdapter):
+    """RSS/Atom feed.
+
+    By default entries are read incrementally with lxml and reading stops
+    after ``limit`` entries or at the first entry already stored from an
+    earlier parse. Malformed feeds fall back to feedparser.
+    """
+
+    kind = 'rss'
+
+    def __init__(self, name: str, url: str, limit: int = 5, core: bool = False,
+                 streaming: bool = True, max_seen: int = 200):
+        super().__init__(name, url, limit=limit, core=core)
+        self.streaming = streaming
+        self._seen_ids = deque(maxlen=max_seen)
+        self._seen_lookup = set()
+
+    def remember(self, ids: List[str]):
+        for article_id in ids:
+            if article_id in self._seen_lookup:
+                continue
+            if len(self._seen_ids) == self._seen_ids.maxlen:
+                self._seen_lookup.discard(self._seen_ids[0])
+            self._seen_ids.append(article_id)
+            self._seen_lookup.add(article_id)
+
+    def _already_seen(self, entry) -> bool:
+        link = entry.get('link')
+        return bool(link) and url_fingerprint(link) in self._seen_lookup
+
+    def parse_entries(self, entries) -> List[Dict]:
+        articles = []
+        for entry in entries:
+            try:
+                summary = ''
+                if hasattr(entry, 'summary'):
+                    summary = html_to_text(entry.summary, max_length=SUMMARY_LENGTH)
+                elif hasattr(entry, 'description'):
+                    summary = html_to_text(entry.description, max_length=SUMMARY_LENGTH)
+
+                link = entry.get('link', '')
+                if not link:
+                    continue
+                published = entry.get('published_parsed') or entry.get('updated_parsed')
+                articles.append(self.make_article(
+                    entry.get('title', 'No title'), link, summary, published))
+            except Exception as e:
+                print(f"  Error parsing entry from {self.name}: {e}")
+        return articles
+
+    def parse_feed(self, feed) -> List[Dict]:
+        """Articles from an already-parsed feedparser result"""
+        return self.parse_entries(feed.entries[:self.limit])
+
+    def parse_content(self, content: bytes, response_headers: Optional[Dict] = None) -> List[Dict]:
+        """Articles from a raw feed body"""
+        if self.streaming:
+            try:
+                entries = list(iter_feed_entries(content, limit=self.limit,
+                                                 stop_at=self._already_seen))
+            except etree.XMLSyntaxError as e:
+                print(f"  {self.name}: malformed XML ({e}), falling back to feedparser")
+            else:
+                return self.parse_entries(entries)
+
+        feed = feedparser.parse(content, response_headers=response_headers)
+        if feed.bozo and not feed.entries:
+            raise ValueError(feed.get('bozo_exception', 'malformed feed'))
+        return self.parse_feed(feed)
+
+    def parse(self, response: FeedResponse) -> List[Dict]:
+        return self.parse_content(response.content, response.parser_headers())
+
+
+class JSONAPIAdapter(SourceAdapter):
+    """JSON API returning a list of posts.
+
+    ``fields`` maps article keys (title, url, summary, source, published) to
+    a key in each post, or a tuple of keys for nested values.
+    """
+
+    kind = 'json'
+
+    def __init__(self, name: str, url: str, items_key: str, fields: Dict,
+                 limit: int = 10, core: bool = False):
+        super().__init__(name, url, limit=limit, core=core)
+        self.items_key = items_key
+        self.fields = fields
+
+    @staticmethod
+    def _lookup(post: Dict, path):
+        if path is None:
+            return None
+        if isinstance(path, str):
+            path = (path,)
+        value = post
+        for key in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    def parse(self, response: FeedResponse) -> List[Dict]:
+        data = json.loads(response.content)
+        articles = []
+        for post in (data.get(self.items_key) or [])[:self.limit]:
+            url = self._lookup(post, self.fields.get('url'))
+            if not url:
+                continue
+            summary = self._lookup(post, self.fields.get('summary')) or ''
+            articles.append(self.make_article(
+                self._lookup(post, self.fields.get('title')),
+                url,
+                html_to_text(summary, max_length=SUMMARY_LENGTH),
+                self._lookup(post, self.fields.get('published')),
+                source=self._lookup(post, self.fields.get('source'))))
+        return articles
+
+
+class SitemapAdapter(SourceAdapter):
+    """Google News sitemap (``<url><loc>`` with ``<news:news>`` metadata)"""
+
+    kind = 'sitemap'
+
+    NAMESPACES = {
+        'sm': 'http://www.sitemaps.org/schemas/sitemap/0.9',
+        'news': 'http://www.google.com/schemas/sitemap-news/0.9'
+    }
+
+    def parse(self, response: FeedResponse) -> List[Dict]:
+        parser = etree.XMLParser(resolve_entities=False, no_network=True, recover=True)
+        root = etree.fromstring(response.content, parser=parser)
+        articles = []
+        for node in root.iterfind('sm:url', self.NAMESPACES):
+            url = node.findtext('sm:loc', namespaces=self.NAMESPACES)
+            title = node.findtext('news:news/news:title', namespaces=self.NAMESPACES)
+            if not url or not title:
+                continue
+            published = node.findtext('news:news/news:publication_date',
+                                      namespaces=self.NAMESPACES)
+            articles.append(self.make_article(title.strip(), url.strip(), '', published))
+            if len(articles) >= self.limit:
+                break
+        return articles
+
+
+class SourceRegistry:
+    """Named collection of source adapters"""
+
+    def __init__(self):
+        self._sources = {}
+
+    def register(self, adapter: SourceAdapter) -> SourceAdapter:
+        self._sources[adapter.name] = adapter
+        return adapter
+
+    def get(self, name: str) -> Optional[SourceAdapter]:
+        return self._sources.get(name)
+
+    def all(self) -> List[SourceAdapter]:
+        return list(self._sources.values())
+
+    def core(self) -> List[SourceAdapter]:
+        return [a for a in self._sources.values() if a.core]
+
+    def resolve(self, feeds: Dict[str, str]) -> List[SourceAdapter]:
+        """Adapters for ``{name: url}``, falling back to RSS for unknown names"""
+        adapters = []
+        for name, url in feeds.items():
+            adapter = self._sources.get(name)
+            if adapter is None or adapter.url != url:
+                adapter = RSSAdapter(name, url)
+            adapters.append(adapter)
+        return adapters
+
+    def commit_seen(self, responses: Iterable[FeedResponse]):
+        """Mark the items of ``responses`` as seen by their adapters.
+
+        Like ``FeedValidatorStore.commit``, call this only once the items
+        are stored: an RSS adapter stops reading a feed at the first seen
+        entry, so ids remembered before a failed ingest would hide those
+        stories from every retry.
+        """
+        for response in responses:
+            adapter = self._sources.get(response.source)
+            if adapter is not None and adapter.url == response.url and response.seen_ids:
+                adapter.remember(response.seen_ids)
+
+    def metrics(self) -> Dict[str, Dict]:
+        return {name: dict(adapter.metrics.to_dict(), kind=adapter.kind)
+                for name, adapter in self._sources.items()}
+
+
+def run_sources(adapters: List[SourceAdapter],
+                fetcher: FeedFetcher) -> Tuple[Dict[str, List[Dict]], Dict[str, FeedResponse]]:
+    """Fetch every adapter's source in parallel and parse the results.
+
+    Returns ``(articles_by_source, responses)``.
+    """
+    responses = fetcher.fetch_all({adapter.name: adapter.url for adapter in adapters})
+    articles_by_source = {}
+    for adapter in adapters:
+        articles_by_source[adapter.name] = adapter.handle(responses[adapter.name])
+    return articles_by_source, responses
+
+
+registry = SourceRegistry()
+
+for _name, _url, _core in [
+    ('CoinDesk', 'https://www.coindesk.com/arc/outboundfeeds/rss/', True),
+    ('Cointelegraph', 'https://cointelegraph.com/rss', True),
+    ('Bitcoin.com', 'https://news.bitcoin.com/feed/', True),
+    ('Decrypt', 'https://decrypt.co/feed', True),
+    ('CryptoSlate', 'https://cryptoslate.com/feed/', True),
+    ('Bitcoin Magazine', 'https://bitcoinmagazine.com/feed', False),
+    ('CoinJournal', 'https://coinjournal.net/news/feed/', False),
+    ('Crypto News', 'https://crypto.news/feed/', False),
+    ('BeInCrypto', 'https://beincrypto.com/feed/', False),
+    ('Crypto Briefing', 'https://cryptobriefing.com/feed/', False),
+]:
+    registry.register(RSSAdapter(_name, _url, core=_core))
+
+# CryptoPanic works without an auth token for public posts
+_cryptopanic_url = 'https://cryptopanic.com/api/v1/posts/?public=true&limit=10'
+if os.environ.get('CRYPTOPANIC_TOKEN'):
+    _cryptopanic_url += f"&auth_token={os.environ['CRYPTOPANIC_TOKEN']}"
+registry.register(JSONAPIAdapter(
+    'CryptoPanic', _cryptopanic_url, items_key='results',
+    fields={'title': 'title', 'url': 'url', 'source': ('source', 'title'),
+            'published': 'published_at'}))
+
+# NewsAPI needs a (free) key from https://newsapi.org/
+if os.environ.get('NEWSAPI_KEY'):
+    registry.register(JSONAPIAdapter(
+        'NewsAPI',
+        'https://newsapi.org/v2/everything?q=cryptocurrency+OR+bitcoin+OR+ethereum'
+        f"&sortBy=publishedAt&language=en&apiKey={os.environ['NEWSAPI_KEY']}",
+        items_key='articles',
+        fields={'title': 'title', 'url': 'url', 'summary': 'description',
+                'source': ('source', 'name'), 'published': 'publishedAt'}))
@@ -0,0 +1,157 @@
+"""
+In-process snapshot of the latest price per symbol
+
+update_prices publishes a new snapshot once per refresh; request handlers
+read it from memory. The snapshot is also written to a small JSON file so
+every gunicorn worker picks up a refresh made by any other worker, by
+checking the file's mtime at most once per ``check_interval`` seconds.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class PriceSnapshot:
+    """Latest prices keyed by lowercase symbol, with a version number"""
+
+    def __init__(self, path: str = 'price_snapshot.json', check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._version = 0
+        self._prices = {}
+        self._updated_at = None
+        # Version at which each symbol last changed or was removed, for deltas
+        self._changed_at = {}
+        self._removed_at = {}
+        self._file_mtime = None
+        self._next_check = 0.0
+        self.seeded = False
+
+    def _load_file(self) -> bool:
+        """Reload from disk if another worker published; True if reloaded"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._file_mtime:
+            return False
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        self._file_mtime = mtime
+        if data.get('version', 0) >= self._version:
+            self._version = data.get('version', 0)
+            self._prices = data.get('prices', {})
+            self._updated_at = data.get('updated_at')
+            self._changed_at = data.get('changed_at', {})
+            self._removed_at = data.get('removed_at', {})
+        return True
+
+    def get(self) -> Tuple[int, Dict[str, Dict]]:
+        """``(version, prices)``; never touches the database"""
+        now = time.monotonic()
+        if now >= self._next_check:
+            with self._lock:
+                if now >= self._next_check:
+                    self._next_check = now + self.check_interval
+                    self._load_file()
+        return self._version, self._prices
+
+    @property
+    def version(self) -> int:
+        return self.get()[0]
+
+    @property
+    def updated_at(self) -> Optional[str]:
+        self.get()
+        return self._updated_at
+
+    def publish(self, prices: Dict[str, Dict]) -> int:
+        """Replace the snapshot for every worker and return its new version"""
+        with self._lock:
+            lock_file = None
+            try:
+                if fcntl is not None:
+                    lock_file = open(f'{self.path}.lock', 'w')
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+                # Pick up the latest version any worker wrote before bumping it
+                self._load_file()
+                version = self._version + 1
+                updated_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+                changed_at = {symbol: self._changed_at.get(symbol, 0) for symbol in prices}
+                for symbol, entry in prices.items():
+                    if self._prices.get(symbol) != entry:
+                        changed_at[symbol] = version
+                removed_at = {symbol: removed for symbol, removed in self._removed_at.items()
+                              if symbol not in prices}
+                for symbol in self._prices:
+                    if symbol not in prices:
+                        removed_at[symbol] = version
+
+                data = {'version': version, 'updated_at': updated_at, 'prices': prices,
+                        'changed_at': changed_at, 'removed_at': removed_at}
+
+                tmp_path = f'{self.path}.{os.getpid()}.tmp'
+                try:
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump(data, f)
+                    os.replace(tmp_path, self.path)
+                    self._file_mtime = os.stat(self.path).st_mtime_ns
+                except OSError as e:
+                    print(f"Could not write price snapshot to {self.path}: {e}")
+
+                self._version = version
+                self._prices = prices
+                self._updated_at = updated_at
+                self._changed_at = changed_at
+                self._removed_at = removed_at
+                return version
+            finally:
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+
+    def changes_since(self, since: int) -> Dict:
+        """Symbols changed or removed after version ``since``"""
+        version, prices = self.get()
+        changed_at, removed_at = self._changed_at, self._removed_at
+        return {
+            'version': version,
+            'changed': {symbol: entry for symbol, entry in prices.items()
+                        if changed_at.get(symbol, 0) > since},
+            'removed': [symbol for symbol, removed in removed_at.items() if removed > since],
+        }
+
+    def seed(self, prices: Dict[str, Dict]):
+        """Fill an empty snapshot once (e.g. from the database on a cold start)"""
+        with self._lock:
+            self.seeded = True
+            if not self._prices:
+                self._prices = prices
+
+
+def price_entry(row) -> Dict:
+    """Snapshot entry for a PriceData row"""
+    return {
+        'name': row.name,
+        'price': row.price_usd,
+        'change_24h': row.change_24h,
+        'market_cap': row.market_cap,
+        'volume_24h': row.volume_24h,
+        'updated': row.timestamp.isoformat() if row.timestamp else None
+    }
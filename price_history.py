@@ -0,0 +1,194 @@
+"""
+Fixed-size price history series for charts
+
+The stored series for a range (raw, hourly or daily, see price_retention)
+is loaded into NumPy arrays once and reduced to at most ``points`` values,
+either as OHLC buckets or as an LTTB-downsampled close line. Results are
+cached per time slot, so every chart request for the same range within a
+slot is served from memory.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import numpy as np
+
+from price_retention import query_range
+
+RANGES = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+    '1y': timedelta(days=365),
+}
+DEFAULT_POINTS = 200
+# LTTB keeps both endpoints plus one pick per bucket, so it needs three
+MIN_POINTS = 3
+MAX_POINTS = 1000
+METHODS = ('ohlc', 'lttb')
+
+# New prices arrive every 5 minutes, so no slot needs to be longer than that
+MAX_SLOT_SECONDS = 300
+
+
+def load_series(symbol: str, start: datetime, end: datetime):
+    """``(resolution, times_ms, open, high, low, close)`` as NumPy arrays"""
+    resolution, rows = query_range(symbol, start, end)
+    if not rows:
+        empty = np.empty(0)
+        return resolution, empty.astype(np.int64), empty, empty, empty, empty
+
+    columns = list(zip(*rows))
+    times = np.array(columns[0], dtype='datetime64[ms]').astype(np.int64)
+    prices = np.array(columns[1:5], dtype=np.float64)
+    return (resolution, times) + tuple(prices)
+
+
+def ohlc_buckets(times, open_, high, low, close, start_ms: int, end_ms: int, points: int):
+    """Aggregate a time-ordered series into ``points`` equal-width OHLC buckets.
+
+    Returns ``(bucket_start_ms, open, high, low, close)`` arrays; empty
+    buckets are dropped rather than interpolated.
+    """
+    if len(times) == 0:
+        return times, open_, high, low, close
+
+    width = (end_ms - start_ms) / points
+    index = np.clip(((times - start_ms) // width).astype(np.int64), 0, points - 1)
+    starts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+    ends = np.r_[starts[1:], len(times)] - 1
+
+    bucket_times = (start_ms + index[starts] * width).astype(np.int64)
+    return (bucket_times, open_[starts], np.maximum.reduceat(high, starts),
+            np.minimum.reduceat(low, starts), close[ends])
+
+
+def lttb(times, values, points: int):
+    """Largest-Triangle-Three-Buckets downsampling; returns ``(times, values)``"""
+    n = len(times)
+    if points >= n:
+        return times, values
+    if points < 3:
+        # Too few points for a middle bucket: keep the endpoints that fit
+        selected = np.array([0, n - 1][:max(points, 0)], dtype=np.int64)
+        return times[selected], values[selected]
+
+    x = times.astype(np.float64)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    previous = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_lo, next_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        next_hi = max(next_hi, next_lo + 1)
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = values[next_lo:next_hi].mean()
+
+        # Triangle area between the previous pick, each candidate and the
+        # next bucket's average, for the whole bucket at once
+        area = np.abs((x[previous] - avg_x) * (values[lo:hi] - values[previous]) -
+                      (x[previous] - x[lo:hi]) * (avg_y - values[previous]))
+        previous = lo + int(np.argmax(area))
+        selected[i + 1] = previous
+
+    return times[selected], values[selected]
+
+
+class PriceHistoryCache:
+    """LRU of computed histories keyed by request and time slot"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+history_cache = PriceHistoryCache()
+
+
+def slot_seconds(range_name: str, points: int) -> int:
+    """How long one computed history stays valid"""
+    width = RANGES[range_name].total_seconds() / points
+    return int(max(60, min(width, MAX_SLOT_SECONDS)))
+
+
+def price_history(symbol: str, range_name: str = '24h', points: int = DEFAULT_POINTS,
+                  method: str = 'ohlc', now: Optional[float] = None) -> Dict:
+    """History of ``symbol`` over ``range_name`` reduced to at most ``points`` points.
+
+    ``points`` is clamped to MIN_POINTS..MAX_POINTS. Raises ValueError for
+    an unknown range or method.
+    """
+    if range_name not in RANGES:
+        raise ValueError(f"range must be one of {', '.join(RANGES)}")
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+    points = max(MIN_POINTS, min(points, MAX_POINTS))
+    symbol = symbol.upper()
+
+    slot = slot_seconds(range_name, points)
+    now = time.time() if now is None else now
+    end_ts = (int(now) // slot + 1) * slot
+    key = (symbol, range_name, points, method, end_ts)
+
+    cached = history_cache.get(key)
+    if cached is not None:
+        return cached
+
+    end = datetime.fromtimestamp(end_ts, timezone.utc).replace(tzinfo=None)
+    start = end - RANGES[range_name]
+    resolution, times, open_, high, low, close = load_series(symbol, start, end)
+
+    if method == 'lttb':
+        times, close = lttb(times, close, points)
+        columns = ['t', 'price']
+        data = np.column_stack([times, close])
+    else:
+        start_ms = int((end_ts - RANGES[range_name].total_seconds()) * 1000)
+        times, open_, high, low, close = ohlc_buckets(
+            times, open_, high, low, close, start_ms, end_ts * 1000, points)
+        columns = ['t', 'open', 'high', 'low', 'close']
+        data = np.column_stack([times, open_, high, low, close])
+
+    rows = data.tolist()
+    for row in rows:
+        row[0] = int(row[0])
+
+    result = {
+        'symbol': symbol,
+        'range': range_name,
+        'method': method,
+        'source_resolution': resolution,
+        'columns': columns,
+        'data': rows,
+        'expires': end_ts,
+    }
+    history_cache.set(key, result)
+    return result
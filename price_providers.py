@@ -0,0 +1,389 @@
+"""
+Price providers for update_prices
+
+A provider turns a list of tracked assets into quotes keyed by symbol.
+Quotes use PriceData's column names so they can be bulk-inserted as-is.
+
+Every HTTP provider shares a pooled keep-alive session, uses strict
+connect/read timeouts, retries transient failures with jittered
+exponential backoff and sits behind a circuit breaker, so a hung or
+failing upstream costs at most one timeout per refresh before it is
+skipped entirely. ProviderChain asks providers in order and only asks the
+next one for the symbols still missing, so a slow primary never leaves
+prices stale.
+
+PRICE_PROVIDERS picks the chain, e.g. ``coingecko,binance`` (default) or
+``stub`` for offline development.
+"""
+
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+Asset = namedtuple('Asset', ['symbol', 'coingecko_id', 'name'])
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ProviderError(Exception):
+    """A provider could not return any quotes"""
+
+
+class RateLimiter:
+    """Spaces calls at least ``min_interval`` seconds apart across threads"""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class CircuitBreaker:
+    """Stops calling a provider after repeated failures.
+
+    Opens after ``failure_threshold`` consecutive failed fetches; after
+    ``reset_timeout`` seconds one trial fetch is let through (half-open)
+    and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 300):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'half-open':
+                # Let exactly one trial through until it reports back
+                self.opened_at = time.monotonic()
+                return True
+            return state == 'closed'
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def shared_session() -> requests.Session:
+    """One pooled keep-alive session for every price provider"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers['User-Agent'] = 'BlockWireNews/1.0 (+https://www.blockwirenews.com)'
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+class PriceProvider:
+    """Base class: retries, timeouts and circuit breaking around ``_fetch``"""
+
+    name = 'provider'
+
+    def __init__(self, timeout=(3.05, 8), retries: int = 2, backoff: float = 0.5,
+                 breaker: Optional[CircuitBreaker] = None,
+                 session: Optional[requests.Session] = None, verify: bool = True):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session = session
+        self.verify = verify
+        self.last_error = None
+        self.last_latency = None
+        self.last_count = 0
+
+    def fetch(self, assets: List[Asset]) -> Dict[str, Dict]:
+        """Quotes keyed by symbol; raises ProviderError if none could be fetched"""
+        if not assets:
+            return {}
+        if not self.breaker.allow():
+            raise ProviderError(f"{self.name} circuit open after {self.breaker.failures} failures")
+
+        started = time.monotonic()
+        try:
+            quotes = self._fetch(assets)
+            if not quotes:
+                raise ProviderError(f"{self.name} returned no prices")
+        except Exception as e:
+            self.breaker.record_failure()
+            self.last_error = str(e)
+            raise ProviderError(str(e)) from e
+        finally:
+            self.last_latency = time.monotonic() - started
+
+        self.breaker.record_success()
+        self.last_error = None
+        self.last_count = len(quotes)
+        return quotes
+
+    def _fetch(self, assets: List[Asset]) -> Dict[str, Dict]:
+        raise NotImplementedError
+
+    def get_json(self, url: str, params: Optional[Dict] = None):
+        """GET with strict timeouts, retrying 429/5xx and network errors"""
+        session = self.session or shared_session()
+        for attempt in range(self.retries + 1):
+            try:
+                response = session.get(url, params=params, timeout=self.timeout,
+                                        verify=self.verify)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+                error = requests.HTTPError(f"{response.status_code} from {url}")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+
+            if attempt == self.retries:
+                raise error
+            # Full jitter keeps workers and retries from synchronizing
+            time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    def status(self) -> Dict:
+        return {
+            'name': self.name,
+            'circuit': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'last_error': self.last_error,
+            'last_latency': round(self.last_latency, 3) if self.last_latency is not None else None,
+            'last_count': self.last_count
+        }
+
+
+class CoinGeckoProvider(PriceProvider):
+    """CoinGecko /simple/price, batched by coin id and fetched concurrently"""
+
+    name = 'coingecko'
+    url = 'https://api.coingecko.com/api/v3/simple/price'
+
+    def __init__(self, batch_size: int = 250, max_workers: int = 4,
+                 min_interval: float = 2.0, **kwargs):
+        super().__init__(**kwargs)
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        # Free tier allows roughly 30 calls a minute
+        self.rate_limiter = RateLimiter(min_interval)
+
+    def batches(self, assets: List[Asset]) -> List[List[Asset]]:
+        return [assets[i:i + self.batch_size]
+                for i in range(0, len(assets), self.batch_size)]
+
+    def _fetch(self, assets: List[Asset]) -> Dict[str, Dict]:
+        """A failed batch only loses its own coins"""
+        batches = self.batches(assets)
+        quotes = {}
+        errors = []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            for batch_quotes, error in executor.map(self._fetch_batch_safe, batches):
+                quotes.update(batch_quotes)
+                if error:
+                    errors.append(error)
+        if errors and not quotes:
+            raise ProviderError(errors[0])
+        for error in errors:
+            print(f"Error fetching a batch of prices from {self.name}: {error}")
+        return quotes
+
+    def _fetch_batch_safe(self, batch: List[Asset]):
+        try:
+            return self._fetch_batch(batch), None
+        except Exception as e:
+            return {}, str(e)
+
+    def _fetch_batch(self, batch: List[Asset]) -> Dict[str, Dict]:
+        params = {
+            'ids': ','.join(asset.coingecko_id for asset in batch),
+            'vs_currencies': 'usd',
+            'include_24hr_change': 'true',
+            'include_market_cap': 'true',
+            'include_24hr_vol': 'true'
+        }
+        self.rate_limiter.wait()
+        data = self.get_json(self.url, params)
+
+        quotes = {}
+        for asset in batch:
+            info = data.get(asset.coingecko_id)
+            if not info or info.get('usd') is None:
+                continue
+            quotes[asset.symbol] = {
+                'symbol': asset.symbol,
+                'name': asset.name,
+                'price_usd': info.get('usd'),
+                'change_24h': info.get('usd_24h_change', 0),
+                'market_cap': info.get('usd_market_cap', 0),
+                'volume_24h': info.get('usd_24h_vol', 0)
+            }
+        return quotes
+
+
+class BinanceProvider(PriceProvider):
+    """Binance 24h tickers against USDT; no market cap.
+
+    One unfiltered call returns every ticker, which avoids the whole
+    request failing on a symbol Binance does not list.
+    """
+
+    name = 'binance'
+    url = 'https://api.binance.com/api/v3/ticker/24hr'
+    quote_asset = 'USDT'
+
+    def _fetch(self, assets: List[Asset]) -> Dict[str, Dict]:
+        wanted = {f'{asset.symbol}{self.quote_asset}': asset for asset in assets}
+        quotes = {}
+        for ticker in self.get_json(self.url):
+            asset = wanted.get(ticker.get('symbol'))
+            if asset is None or ticker.get('lastPrice') is None:
+                continue
+            quotes[asset.symbol] = {
+                'symbol': asset.symbol,
+                'name': asset.name,
+                'price_usd': float(ticker['lastPrice']),
+                'change_24h': float(ticker.get('priceChangePercent') or 0),
+                'market_cap': None,
+                'volume_24h': float(ticker.get('quoteVolume') or 0)
+            }
+        return quotes
+
+
+class StubProvider(PriceProvider):
+    """Offline provider for tests and local development.
+
+    Returns ``quotes`` when given, otherwise a stable made-up price per
+    symbol. ``delay`` and ``fail`` simulate a slow or broken upstream.
+    """
+
+    name = 'stub'
+
+    def __init__(self, quotes: Optional[Dict[str, float]] = None, delay: float = 0,
+                 fail: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.quotes = quotes
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def _fetch(self, assets: List[Asset]) -> Dict[str, Dict]:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise ProviderError('stub provider failure')
+
+        quotes = {}
+        for asset in assets:
+            if self.quotes is not None:
+                if asset.symbol not in self.quotes:
+                    continue
+                price = self.quotes[asset.symbol]
+            else:
+                digest = hashlib.blake2b(asset.symbol.encode(), digest_size=4).digest()
+                price = 1 + int.from_bytes(digest, 'big') % 100000 / 10.0
+            quotes[asset.symbol] = {
+                'symbol': asset.symbol,
+                'name': asset.name,
+                'price_usd': price,
+                'change_24h': 0.0,
+                'market_cap': 0,
+                'volume_24h': 0
+            }
+        return quotes
+
+
+class ProviderChain:
+    """Asks providers in order, each only for the symbols still missing"""
+
+    def __init__(self, providers: List[PriceProvider]):
+        self.providers = providers
+        self.last_sources = {}
+
+    @property
+    def name(self) -> str:
+        return ','.join(provider.name for provider in self.providers)
+
+    def fetch(self, assets: List[Asset]) -> Dict[str, Dict]:
+        quotes = {}
+        sources = {}
+        for provider in self.providers:
+            missing = [asset for asset in assets if asset.symbol not in quotes]
+            if not missing:
+                break
+            try:
+                provided = provider.fetch(missing)
+            except ProviderError as e:
+                print(f"Price provider {provider.name} failed: {e}")
+                continue
+            for symbol, quote in provided.items():
+                quotes[symbol] = quote
+                sources[symbol] = provider.name
+        self.last_sources = sources
+        return quotes
+
+    def status(self) -> List[Dict]:
+        counts = {}
+        for source in self.last_sources.values():
+            counts[source] = counts.get(source, 0) + 1
+        return [dict(provider.status(), served_last_refresh=counts.get(provider.name, 0))
+                for provider in self.providers]
+
+
+PROVIDERS = {
+    'coingecko': CoinGeckoProvider,
+    'binance': BinanceProvider,
+    'stub': StubProvider,
+}
+
+
+def build_price_provider(spec: Optional[str] = None) -> ProviderChain:
+    """Provider chain from a comma-separated list such as ``coingecko,binance``"""
+    spec = spec or os.environ.get('PRICE_PROVIDERS', 'coingecko,binance')
+    verify = os.environ.get('PRICE_API_VERIFY_SSL', 'true').lower() != 'false'
+    providers = []
+    for name in spec.split(','):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in PROVIDERS:
+            raise ValueError(f"Unknown price provider {name!r}")
+        providers.append(PROVIDERS[name](verify=verify))
+    return ProviderChain(providers)
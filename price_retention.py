@@ -0,0 +1,270 @@
+"""
+Retention tiers for price_data
+
+Raw ticks from update_prices are rolled up into hourly OHLC rows, and
+hourly rows into daily ones. Each rollup keeps a watermark in SiteSettings
+and only processes completed periods past it, one short transaction per
+batch. Raw and hourly rows are pruned once they are older than their
+retention window *and* covered by the next tier, so no data is lost.
+
+    raw    price_data      PRICE_RAW_RETENTION_DAYS (default 7)
+    1h     price_ohlc_1h   PRICE_HOURLY_RETENTION_DAYS (default 365)
+    1d     price_ohlc_1d   kept forever
+
+query_range() reads any range at the finest resolution still available
+for it, filling the not-yet-rolled tail from the finer tiers.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from models import db, PriceData, PriceOHLC1h, PriceOHLC1d, SiteSettings
+
+RAW_RETENTION_DAYS = int(os.environ.get('PRICE_RAW_RETENTION_DAYS', '7'))
+HOURLY_RETENTION_DAYS = int(os.environ.get('PRICE_HOURLY_RETENTION_DAYS', '365'))
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+
+class RetentionTier:
+    """One resolution of the price history"""
+
+    def __init__(self, name: str, model, period: Optional[timedelta],
+                 retention_days: Optional[int], batch: Optional[timedelta] = None,
+                 max_span: Optional[timedelta] = None, finer: 'RetentionTier' = None):
+        self.name = name
+        self.model = model
+        self.period = period
+        self.retention_days = retention_days
+        self.batch = batch
+        self.max_span = max_span
+        self.finer = finer
+        self.coarser = None
+        if finer is not None:
+            finer.coarser = self
+
+    @property
+    def time_column(self):
+        return self.model.timestamp if self.model is PriceData else self.model.bucket
+
+    @property
+    def watermark_key(self) -> str:
+        return f'price_rollup_{self.name}_watermark'
+
+    def watermark(self) -> Optional[datetime]:
+        """End of the last period rolled into this tier"""
+        if self.finer is None:
+            return None
+        value = SiteSettings.get(self.watermark_key)
+        return datetime.fromisoformat(value) if value else None
+
+    def floor(self, ts: datetime) -> datetime:
+        if self.period == DAY:
+            return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+        return ts.replace(minute=0, second=0, microsecond=0)
+
+
+RAW = RetentionTier('raw', PriceData, None, RAW_RETENTION_DAYS, max_span=2 * DAY)
+HOURLY = RetentionTier('1h', PriceOHLC1h, HOUR, HOURLY_RETENTION_DAYS, batch=DAY,
+                       max_span=90 * DAY, finer=RAW)
+DAILY = RetentionTier('1d', PriceOHLC1d, DAY, None, batch=30 * DAY, finer=HOURLY)
+
+TIERS = [RAW, HOURLY, DAILY]
+TIERS_BY_NAME = {tier.name: tier for tier in TIERS}
+
+
+def _source_rows(tier: RetentionTier, start: datetime, end: datetime,
+                 symbol: Optional[str] = None):
+    """``(symbol, time, open, high, low, close, market_cap, volume, samples)``"""
+    column = tier.time_column
+    if tier is RAW:
+        query = db.session.query(
+            PriceData.symbol, PriceData.timestamp, PriceData.price_usd, PriceData.price_usd,
+            PriceData.price_usd, PriceData.price_usd, PriceData.market_cap,
+            PriceData.volume_24h, db.literal(1)
+        ).filter(PriceData.price_usd.isnot(None))
+    else:
+        model = tier.model
+        query = db.session.query(
+            model.symbol, model.bucket, model.open, model.high, model.low,
+            model.close, model.market_cap, model.volume_24h, model.samples
+        )
+    if symbol is not None:
+        query = query.filter(tier.model.symbol == symbol)
+    query = query.filter(column >= start, column < end)
+    return query.order_by(tier.model.symbol, column).all()
+
+
+def _aggregate(tier: RetentionTier, rows) -> List[Dict]:
+    """Fold time-ordered finer rows into one OHLC row per symbol and period"""
+    buckets = {}
+    for symbol, ts, open_, high, low, close, market_cap, volume, samples in rows:
+        key = (symbol, tier.floor(ts))
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = {
+                'symbol': symbol, 'bucket': key[1], 'open': open_, 'high': high,
+                'low': low, 'close': close, 'market_cap': market_cap,
+                'volume_24h': volume, 'samples': samples or 0
+            }
+        else:
+            bucket['high'] = max(bucket['high'], high)
+            bucket['low'] = min(bucket['low'], low)
+            bucket['close'] = close
+            bucket['market_cap'] = market_cap
+            bucket['volume_24h'] = volume
+            bucket['samples'] += samples or 0
+    return list(buckets.values())
+
+
+def rollup(tier: RetentionTier, now: Optional[datetime] = None) -> int:
+    """Roll completed periods of the finer tier into ``tier``; returns rows written"""
+    now = now or datetime.utcnow()
+    source = tier.finer
+
+    watermark = tier.watermark()
+    if watermark is None:
+        first = db.session.query(db.func.min(source.time_column)).scalar()
+        if first is None:
+            return 0
+        watermark = tier.floor(first)
+
+    # Only whole periods, and only what the finer tier has itself completed
+    limit = tier.floor(now)
+    source_watermark = source.watermark()
+    if source.finer is not None:
+        if source_watermark is None:
+            return 0
+        limit = min(limit, tier.floor(source_watermark))
+
+    written = 0
+    while watermark < limit:
+        end = min(watermark + tier.batch, limit)
+        rows = _aggregate(tier, _source_rows(source, watermark, end))
+
+        # Delete + insert keeps re-runs of a batch idempotent on any dialect
+        tier.model.query.filter(tier.model.bucket >= watermark,
+                                tier.model.bucket < end).delete(synchronize_session=False)
+        if rows:
+            db.session.execute(db.insert(tier.model), rows)
+        # Commits the batch and its watermark together
+        SiteSettings.set(tier.watermark_key, end.isoformat(),
+                         f'Price data rolled into {tier.model.__tablename__} up to here')
+
+        written += len(rows)
+        watermark = end
+    return written
+
+
+def prune(tier: RetentionTier, now: Optional[datetime] = None,
+          batch_size: int = 5000) -> int:
+    """Delete rows past the tier's retention that the next tier already covers"""
+    if tier.retention_days is None or tier.coarser is None:
+        return 0
+
+    covered = tier.coarser.watermark()
+    if covered is None:
+        return 0
+    cutoff = min((now or datetime.utcnow()) - timedelta(days=tier.retention_days), covered)
+
+    model = tier.model
+    deleted = 0
+    while True:
+        # Oldest rows have the lowest ids, so walking the primary key stops early
+        ids = [row_id for (row_id,) in db.session.query(model.id).filter(
+            tier.time_column < cutoff).order_by(model.id).limit(batch_size)]
+        if not ids:
+            break
+        model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(ids)
+    return deleted
+
+
+def run_retention(now: Optional[datetime] = None) -> Dict[str, int]:
+    """Roll up then prune every tier; safe to run as often as wanted"""
+    counts = {
+        'rolled_1h': rollup(HOURLY, now),
+        'rolled_1d': rollup(DAILY, now),
+    }
+    counts['pruned_raw'] = prune(RAW, now)
+    counts['pruned_1h'] = prune(HOURLY, now)
+    return counts
+
+
+def resolution_for(start: datetime, end: datetime,
+                   now: Optional[datetime] = None) -> RetentionTier:
+    """Finest tier that keeps ``start`` and suits the length of the range"""
+    now = now or datetime.utcnow()
+    for tier in TIERS:
+        if tier.retention_days is not None and start < now - timedelta(days=tier.retention_days):
+            continue
+        if tier.max_span is not None and end - start > tier.max_span:
+            continue
+        return tier
+    return DAILY
+
+
+def _series(tier: RetentionTier, symbol: str, start: datetime, end: datetime) -> List[Tuple]:
+    rows = []
+    split = end
+    if tier.finer is not None:
+        watermark = tier.watermark() or start
+        split = min(max(watermark, start), end)
+
+    if start < split:
+        rows = [row[1:8] for row in _source_rows(tier, start, split, symbol)]
+    if split < end:
+        rows += _series(tier.finer, symbol, split, end)
+    return rows
+
+
+def query_range(symbol: str, start: datetime, end: Optional[datetime] = None,
+                resolution: Optional[str] = None) -> Tuple[str, List[Tuple]]:
+    """``(resolution, rows)`` for ``symbol`` between ``start`` and ``end``.
+
+    Rows are time-ordered ``(time, open, high, low, close, market_cap,
+    volume_24h)`` tuples. The tail that has not been rolled up yet comes
+    from the finer tiers, so the newest points are always included.
+    """
+    end = end or datetime.utcnow()
+    if resolution is None:
+        tier = resolution_for(start, end)
+    elif resolution in TIERS_BY_NAME:
+        tier = TIERS_BY_NAME[resolution]
+    else:
+        raise ValueError(f"Unknown resolution {resolution!r}")
+    return tier.name, _series(tier, symbol.upper(), start, end)
+
+
+def _closes(tier: RetentionTier, symbols: List[str], start: datetime, end: datetime) -> List[Tuple]:
+    split = end
+    if tier.finer is not None:
+        watermark = tier.watermark() or start
+        split = min(max(watermark, start), end)
+
+    rows = []
+    if start < split:
+        model, column = tier.model, tier.time_column
+        close = PriceData.price_usd if tier is RAW else model.close
+        rows = db.session.query(model.symbol, column, close).filter(
+            model.symbol.in_(symbols), column >= start, column < split,
+            close.isnot(None)
+        ).order_by(column).all()
+    if split < end:
+        rows += _closes(tier.finer, symbols, split, end)
+    return rows
+
+
+def query_closes(symbols: List[str], start: datetime, end: Optional[datetime] = None,
+                 resolution: str = '1h') -> List[Tuple]:
+    """Time-ordered ``(symbol, time, close)`` rows for many symbols at once.
+
+    One query per tier involved (at most three), however many symbols.
+    """
+    end = end or datetime.utcnow()
+    if resolution not in TIERS_BY_NAME:
+        raise ValueError(f"Unknown resolution {resolution!r}")
+    return _closes(TIERS_BY_NAME[resolution], [s.upper() for s in symbols], start, end)
@@ -0,0 +1,169 @@
+"""
+Server-Sent Events fan-out for price updates
+
+One PriceBroadcaster per process watches the PriceSnapshot and, when its
+version changes, pushes a delta (changed and removed symbols) to every
+connected /api/prices/stream client. Because the snapshot is mirrored to
+a shared file, a refresh made by any gunicorn worker reaches the clients
+of every worker; update_prices also calls notify() so its own worker does
+not wait for the next poll.
+
+In production the streams are served by price_stream_server.py, a small
+separate process on gevent workers where an open stream costs a
+greenlet rather than a thread. The main app's own /api/prices/stream
+route is a fallback for single-process setups: there each stream holds
+a gthread worker thread, so its ``max_clients`` stays below the thread
+count. Either way a client over the cap gets a 503 and polls /api/prices
+instead. Streams end after ``max_duration`` seconds and browsers
+reconnect automatically, sending Last-Event-ID so an up-to-date client
+gets no snapshot resend.
+"""
+
+import json
+import queue
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+from flask import Response, jsonify
+
+from price_cache import PriceSnapshot
+
+
+def format_event(event: str, data: Dict, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def price_delta(old: Dict[str, Dict], new: Dict[str, Dict]) -> Dict:
+    """Symbols whose entry changed or disappeared between two snapshots"""
+    return {
+        'changed': {symbol: entry for symbol, entry in new.items() if old.get(symbol) != entry},
+        'removed': [symbol for symbol in old if symbol not in new],
+    }
+
+
+class PriceBroadcaster:
+    """Fans snapshot changes out to per-client queues"""
+
+    def __init__(self, snapshot: PriceSnapshot, poll_interval: float = 1.0,
+                 heartbeat: float = 15.0, max_clients: int = 4,
+                 max_duration: float = 120.0, queue_size: int = 8):
+        self.snapshot = snapshot
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+        self.max_clients = max_clients
+        self.max_duration = max_duration
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.events_sent = 0
+
+    @property
+    def client_count(self) -> int:
+        return len(self._subscribers)
+
+    def notify(self):
+        """Check the snapshot now instead of at the next poll"""
+        self._wakeup.set()
+
+    def subscribe(self) -> Optional[queue.Queue]:
+        """A queue of SSE payloads for one client, or None when full"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            subscriber = queue.Queue(maxsize=self.queue_size)
+            self._subscribers.add(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                # Read the baseline before the client reads its snapshot, so
+                # no version published in between can be missed
+                self._thread = threading.Thread(target=self._watch, args=self.snapshot.get(),
+                                                name='price-broadcaster', daemon=True)
+                self._thread.start()
+            return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _publish(self, payload: str, resync: str):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(payload)
+            except queue.Full:
+                # A client this far behind gets the full snapshot instead
+                while True:
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        break
+                subscriber.put_nowait(resync)
+            self.events_sent += 1
+
+    def _watch(self, version: int, prices: Dict[str, Dict]):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+
+            new_version, new_prices = self.snapshot.get()
+            if new_version == version:
+                continue
+            delta = price_delta(prices, new_prices)
+            version, prices = new_version, new_prices
+            if delta['changed'] or delta['removed']:
+                self._publish(format_event('prices', dict(delta, version=version), version),
+                              format_event('snapshot', {'version': version, 'prices': prices},
+                                           version))
+
+    def stream(self, subscriber: queue.Queue, last_event_id: Optional[str] = None) -> Iterator[str]:
+        """SSE payloads for one client until ``max_duration`` elapses"""
+        try:
+            # Reconnect hint for EventSource, in milliseconds
+            yield 'retry: 5000\n\n'
+            version, prices = self.snapshot.get()
+            if last_event_id != str(version):
+                yield format_event('snapshot', {'version': version, 'prices': prices}, version)
+
+            ends_at = time.monotonic() + self.max_duration
+            while True:
+                remaining = ends_at - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    yield subscriber.get(timeout=min(self.heartbeat, remaining))
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+
+
+def stream_response(broadcaster: PriceBroadcaster, last_event_id: Optional[str] = None) -> Response:
+    """The SSE response for one client, or a 503 when ``broadcaster`` is full"""
+    subscriber = broadcaster.subscribe()
+    if subscriber is None:
+        response = jsonify({'error': 'Too many open price streams, poll /api/prices instead'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+
+    return Response(
+        broadcaster.stream(subscriber, last_event_id),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Stop nginx from buffering the stream
+            'X-Accel-Buffering': 'no'
+        }
+    )
@@ -0,0 +1,48 @@
+"""
+Standalone server for /api/prices/stream
+
+Run it next to the main app with gevent workers:
+
+    gunicorn -c gunicorn_stream.conf.py price_stream_server:app
+
+An open stream costs a greenlet here instead of a gthread worker thread,
+so a single process holds STREAM_MAX_CLIENTS browsers. It reads the same
+PRICE_SNAPSHOT_PATH file update_prices publishes, and it does not import
+app.py: it needs no database and starts no scheduler.
+
+Route ``/api/prices/stream`` to it in the reverse proxy, with buffering
+off, or point PRICE_STREAM_URL at it on another origin and set
+PRICE_STREAM_ALLOW_ORIGIN to the site's origin.
+"""
+
+import os
+
+from flask import Flask, request
+
+from price_cache import PriceSnapshot
+from price_stream import PriceBroadcaster, stream_response
+
+app = Flask(__name__)
+
+price_snapshot = PriceSnapshot(
+    os.environ.get('PRICE_SNAPSHOT_PATH', 'price_snapshot.json'))
+
+price_broadcaster = PriceBroadcaster(
+    price_snapshot, max_clients=int(os.environ.get('STREAM_MAX_CLIENTS', '1000')))
+
+
+@app.route('/api/prices/stream')
+def api_prices_stream():
+    """Server-Sent Events: a snapshot on connect, then a delta per price refresh"""
+    response = stream_response(price_broadcaster, request.headers.get('Last-Event-ID'))
+    allow_origin = os.environ.get('PRICE_STREAM_ALLOW_ORIGIN')
+    if allow_origin:
+        response.headers['Access-Control-Allow-Origin'] = allow_origin
+    return response
+
+
+@app.route('/health')
+def health():
+    return {'clients': price_broadcaster.client_count,
+            'max_clients': price_broadcaster.max_clients,
+            'version': price_snapshot.version}
@@ -0,0 +1,163 @@
+"""
+Validation stage between the price providers and the database
+
+Each quote is checked before it is stored: missing, zero, negative or
+non-finite prices are rejected outright, and prices that jump too far
+from the symbol's recent history (median +/- k * MAD) are held back as
+outliers. When several refreshes in a row are held back and those
+quotes agree with each other, they are taken as the symbol's new level,
+so a genuine regime change only costs a few cycles. Unrelated bad ticks
+from a flapping provider do not agree and keep being rejected.
+
+Counters for every refresh are kept in memory so a broken feed shows up
+on /api/prices/health within one cycle.
+"""
+
+import math
+import statistics
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+# MAD of normally distributed data is 0.6745 sigma
+MAD_TO_SIGMA = 1.4826
+
+
+class PriceValidator:
+    """Rejects invalid and outlier quotes and counts what happened"""
+
+    def __init__(self, window: int = 12, threshold: float = 10.0,
+                 min_deviation: float = 0.15, max_rejections: int = 3,
+                 stale_after: float = 900):
+        self.window = window
+        self.threshold = threshold
+        self.min_deviation = min_deviation
+        self.max_rejections = max_rejections
+        self.stale_after = stale_after
+        self.history = {}
+        # Consecutive outlier prices per symbol, newest last
+        self.rejections = {}
+        self.warmed = False
+        self._lock = threading.Lock()
+        self.metrics = {
+            'refreshes': 0,
+            'failed_refreshes': 0,
+            'accepted': 0,
+            'rejected_invalid': 0,
+            'rejected_outlier': 0,
+            'missing': 0,
+            'last_refresh': None,
+            'last_success': None,
+            'last_error': None,
+        }
+        self.last_rejections = {}
+
+    def warm(self, rows: Iterable):
+        """Seed the history from time-ordered ``(symbol, price)`` rows"""
+        with self._lock:
+            for symbol, price in rows:
+                if self._is_valid(price):
+                    self._history(symbol).append(price)
+            self.warmed = True
+
+    def _history(self, symbol: str) -> deque:
+        if symbol not in self.history:
+            self.history[symbol] = deque(maxlen=self.window)
+        return self.history[symbol]
+
+    @staticmethod
+    def _is_valid(price) -> bool:
+        return isinstance(price, (int, float)) and math.isfinite(price) and price > 0
+
+    def _is_outlier(self, symbol: str, price: float) -> Optional[str]:
+        history = self.history.get(symbol)
+        if not history or len(history) < 3:
+            return None
+        median = statistics.median(history)
+        mad = statistics.median(abs(value - median) for value in history) * MAD_TO_SIGMA
+        deviation = abs(price - median)
+        # The relative floor keeps flat series (tiny MAD) from rejecting everything
+        if deviation > self.threshold * mad and deviation > self.min_deviation * median:
+            return f'{price} is {deviation / median:.0%} away from recent median {median}'
+        return None
+
+    def _is_new_level(self, run: List[float]) -> bool:
+        """Whether a full run of rejected prices sits at one level"""
+        if len(run) < self.max_rejections:
+            return False
+        # Only the relative band: the MAD of a handful of prices says little
+        median = statistics.median(run)
+        return all(abs(price - median) <= self.min_deviation * median for price in run)
+
+    def validate(self, quotes: Dict[str, Dict], symbols: List[str]) -> Dict[str, Dict]:
+        """The quotes fit to store; ``symbols`` are the ones that were asked for"""
+        now = datetime.utcnow().isoformat()
+        accepted = {}
+        with self._lock:
+            self.metrics['refreshes'] += 1
+            self.metrics['last_refresh'] = now
+            self.metrics['missing'] += sum(1 for symbol in symbols if symbol not in quotes)
+
+            for symbol, quote in quotes.items():
+                price = quote.get('price_usd')
+                if not self._is_valid(price):
+                    self.metrics['rejected_invalid'] += 1
+                    self.last_rejections[symbol] = {'at': now, 'reason': f'invalid price {price!r}'}
+                    continue
+
+                reason = self._is_outlier(symbol, price)
+                if reason:
+                    run = self.rejections.setdefault(symbol, deque(maxlen=self.max_rejections))
+                    run.append(price)
+                    if not self._is_new_level(run):
+                        self.metrics['rejected_outlier'] += 1
+                        self.last_rejections[symbol] = {'at': now, 'reason': reason}
+                        continue
+                    # Persistently at one new level: it becomes the history
+                    self.history[symbol] = deque(run, maxlen=self.window)
+                else:
+                    self._history(symbol).append(price)
+
+                self.rejections.pop(symbol, None)
+                accepted[symbol] = quote
+
+            self.metrics['accepted'] += len(accepted)
+            if accepted:
+                self.metrics['last_success'] = now
+                self.metrics['last_error'] = None
+            else:
+                self.metrics['failed_refreshes'] += 1
+                self.metrics['last_error'] = 'no valid prices in refresh'
+        return accepted
+
+    def record_failure(self, error: str):
+        with self._lock:
+            self.metrics['refreshes'] += 1
+            self.metrics['failed_refreshes'] += 1
+            self.metrics['last_refresh'] = datetime.utcnow().isoformat()
+            self.metrics['last_error'] = error
+
+    def stale_symbols(self, prices: Dict[str, Dict], now: Optional[float] = None) -> List[str]:
+        """Snapshot symbols whose last update is older than ``stale_after``"""
+        now = time.time() if now is None else now
+        stale = []
+        for symbol, entry in prices.items():
+            updated = entry.get('updated')
+            if not updated:
+                stale.append(symbol)
+                continue
+            age = now - (datetime.fromisoformat(updated) - datetime(1970, 1, 1)).total_seconds()
+            if age > self.stale_after:
+                stale.append(symbol)
+        return stale
+
+    def status(self, prices: Dict[str, Dict]) -> Dict:
+        with self._lock:
+            metrics = dict(self.metrics)
+            rejections = dict(self.last_rejections)
+        stale = self.stale_symbols(prices)
+        return dict(metrics, stale=stale, stale_count=len(stale),
+                    tracked=len(prices), last_rejections=rejections,
+                    healthy=bool(prices) and len(stale) * 2 < len(prices))
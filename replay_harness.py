@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Offline replay harness for the news scraper
+
+Serves recorded feed payloads from fixtures/feeds over a local HTTP server
+so the scraper pipeline can be exercised and measured without touching
+publisher sites. Besides plain replay, the server can make any fixture
+slow, fail, or balloon in size:
+
+    /feeds/<name>                 recorded payload (honors If-None-Match)
+    /slow/<ms>/<name>             payload after a delay
+    /error/<status>/<name>        empty response with that status
+    /huge/<copies>/<name>         payload with its items repeated <copies> times
+
+Usage:
+    python replay_harness.py serve [--port 8765]
+    python replay_harness.py record      # capture live feeds into fixtures/feeds
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'feeds')
+
+ITEM_RE = re.compile(rb'<(item|entry)[\s>].*?</\1>', re.DOTALL)
+LINK_RE = re.compile(rb'<link>([^<]*)</link>')
+
+
+def load_fixtures(directory: str = FIXTURE_DIR) -> Dict[str, bytes]:
+    """``{name: payload}`` for every recorded feed"""
+    fixtures = {}
+    for filename in sorted(os.listdir(directory)):
+        name, ext = os.path.splitext(filename)
+        if ext in ('.xml', '.json'):
+            with open(os.path.join(directory, filename), 'rb') as f:
+                fixtures[name] = f.read()
+    return fixtures
+
+
+def inflate_feed(payload: bytes, copies: int) -> bytes:
+    """Repeat every item ``copies`` times, giving each copy a unique link"""
+    matches = list(ITEM_RE.finditer(payload))
+    if not matches:
+        return payload
+
+    def relink(item: bytes, copy: int) -> bytes:
+        def add_param(match):
+            link = match.group(1)
+            separator = b'&amp;' if b'?' in link else b'?'
+            return b'<link>' + link + separator + b'copy=%d' % copy + b'</link>'
+        return LINK_RE.sub(add_param, item)
+
+    body = [relink(match.group(0), copy) if copy else match.group(0)
+            for copy in range(copies) for match in matches]
+    return (payload[:matches[0].start()] + b'\n'.join(body) +
+            payload[matches[-1].end():])
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b'', headers: Optional[Dict] = None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        parts = self.path.split('?', 1)[0].strip('/').split('/')
+        fixtures = self.server.fixtures
+
+        mode, argument, name = parts[0], None, parts[-1]
+        if mode in ('slow', 'error', 'huge') and len(parts) == 3:
+            argument = int(parts[1])
+        elif mode != 'feeds' or len(parts) != 2:
+            return self._send(404)
+
+        payload = fixtures.get(name)
+        if payload is None:
+            return self._send(404)
+
+        if mode == 'error':
+            return self._send(argument)
+        if mode == 'slow':
+            time.sleep(argument / 1000.0)
+        if mode == 'huge':
+            payload = self.server.inflated(name, argument)
+
+        etag = '"%s"' % hashlib.blake2b(payload, digest_size=8).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            return self._send(304, headers={'ETag': etag})
+
+        content_type = 'application/json' if payload.lstrip()[:1] in (b'{', b'[') \
+            else 'application/rss+xml; charset=utf-8'
+        self._send(200, payload, {'Content-Type': content_type, 'ETag': etag})
+
+
+class ReplayServer:
+    """Local HTTP stand-in for publisher feeds, run in a background thread"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 fixture_dir: str = FIXTURE_DIR):
+        self.httpd = ThreadingHTTPServer((host, port), ReplayHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fixtures = load_fixtures(fixture_dir)
+        self.httpd.inflated = self._inflated
+        self._inflated_cache = {}
+        self._thread = None
+
+    def _inflated(self, name: str, copies: int) -> bytes:
+        key = (name, copies)
+        if key not in self._inflated_cache:
+            self._inflated_cache[key] = inflate_feed(self.httpd.fixtures[name], copies)
+        return self._inflated_cache[key]
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.httpd.fixtures)
+
+    def url(self, name: str, mode: str = 'feeds', argument: Optional[int] = None) -> str:
+        if mode == 'feeds':
+            return f'{self.base_url}/feeds/{name}'
+        return f'{self.base_url}/{mode}/{argument}/{name}'
+
+    def scenario(self, feeds: int = 10, slow_ms: int = 0, errors: int = 0,
+                 huge_copies: int = 0) -> Dict[str, str]:
+        """``{source: url}`` mixing plain, slow, erroring and huge feeds.
+
+        The first feed is slow (when ``slow_ms``), the next is huge (when
+        ``huge_copies``), the next ``errors`` return 500 and the rest replay
+        normally, cycling through the recorded fixtures.
+        """
+        names = self.names
+        mapping = {}
+        for i in range(feeds):
+            name = names[i % len(names)]
+            source = f'replay-{i}-{name}'
+            if slow_ms and i == 0:
+                mapping[source] = self.url(name, 'slow', slow_ms)
+            elif huge_copies and i == 1:
+                mapping[source] = self.url(name, 'huge', huge_copies)
+            elif 2 <= i < 2 + errors:
+                mapping[source] = self.url(name, 'error', 500)
+            else:
+                mapping[source] = self.url(name)
+        return mapping
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        name='replay-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def record(directory: str = FIXTURE_DIR):
+    """Capture every registered source's current payload as a fixture"""
+    from feed_fetcher import FeedFetcher
+    from news_sources import registry
+
+    os.makedirs(directory, exist_ok=True)
+    adapters = registry.all()
+    responses = FeedFetcher().fetch_all({a.name: a.url for a in adapters})
+    for adapter in adapters:
+        response = responses[adapter.name]
+        if not response.ok:
+            print(f"  {adapter.name}: {response.error or response.status}, skipped")
+            continue
+        slug = re.sub(r'[^a-z0-9]+', '_', adapter.name.lower()).strip('_')
+        ext = '.json' if adapter.kind == 'json' else '.xml'
+        with open(os.path.join(directory, slug + ext), 'wb') as f:
+            f.write(response.content)
+        print(f"  {adapter.name}: {len(response.content)} bytes -> {slug}{ext}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve = subparsers.add_parser('serve', help='serve fixtures until interrupted')
+    serve.add_argument('--port', type=int, default=8765)
+    subparsers.add_parser('record', help='capture live feeds into fixtures')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record()
+        return
+
+    server = ReplayServer(port=args.port).start()
+    print(f"Replaying {len(server.names)} feeds at {server.base_url}")
+    for name in server.names:
+        print(f"  {server.url(name)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+"""
+Full-page cache for anonymous GET requests
+
+A page is stored under a key built from its path, its sorted query string
+and the data versions it depends on (see DataVersions). A new news item,
+price snapshot or article save therefore makes old entries unreachable,
+so nothing has to be purged. ``ttl`` only limits how long a page can go
+on showing relative content such as dates.
+
+Backends:
+
+* MemoryBackend: a per-process LRU. It is the fastest, but every worker
+  fills its own copy.
+* FileBackend: one file per page in a directory shared by all workers.
+  If the directory is on tmpfs (``/dev/shm``), reads are served from
+  memory.
+
+Each page is stored with gzip and, when available, brotli variants, so
+hits are served precompressed (see compression.py).
+
+On a miss, the request takes a fill lock for the key. The locks are
+striped by key, and the file backend also flocks them across workers.
+A burst of requests for the same cold page then renders it once; the
+other requests wait for that result.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlencode
+
+from compression import compress_variants, is_compressible
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ``variants`` maps a content coding to the compressed body
+CachedPage = namedtuple('CachedPage', ['status', 'headers', 'body', 'created', 'variants'])
+
+# Recomputed or connection-specific, so never replayed from the cache
+SKIP_HEADERS = {'content-length', 'content-encoding', 'set-cookie', 'connection',
+                'transfer-encoding', 'date'}
+
+
+def page_size(page: CachedPage) -> int:
+    return len(page.body) + sum(len(data) for data in page.variants.values())
+
+
+class MemoryBackend:
+    """Per-process LRU bounded by entry count and total body size"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries: int = 500, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedPage]:
+        with self._lock:
+            page = self._entries.get(key)
+            if page is not None:
+                self._entries.move_to_end(key)
+            return page
+
+    def set(self, key: str, page: CachedPage):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= page_size(old)
+            self._entries[key] = page
+            self._size += page_size(page)
+            while self._entries and (len(self._entries) > self.max_entries or
+                                     self._size > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= page_size(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def lock_path(self, stripe: int) -> Optional[str]:
+        return None
+
+    def stats(self) -> Dict:
+        return {'entries': len(self._entries), 'bytes': self._size}
+
+
+class FileBackend:
+    """One file per page in a directory shared by every worker.
+
+    Each file holds a JSON header line followed by the body and then each
+    compressed variant, whose lengths the header records. Files are
+    written to a temporary name and renamed into place, so readers never
+    see a partial page. The oldest files are pruned when the directory
+    grows past ``max_entries``.
+    """
+
+    name = 'file'
+
+    def __init__(self, directory: str = 'page_cache', max_entries: int = 2000,
+                 prune_every: int = 100):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory,
+                            hashlib.sha256(key.encode()).hexdigest() + '.page')
+
+    def get(self, key: str) -> Optional[CachedPage]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                meta = json.loads(f.readline())
+                if meta.get('key') != key:
+                    return None
+                body = f.read(meta['length'])
+                variants = {encoding: f.read(length)
+                            for encoding, length in meta['variants'].items()}
+        except (OSError, ValueError, KeyError):
+            return None
+        return CachedPage(meta['status'], [tuple(h) for h in meta['headers']],
+                          body, meta['created'], variants)
+
+    def set(self, key: str, page: CachedPage):
+        path = self._path(key)
+        meta = {'key': key, 'status': page.status, 'headers': page.headers,
+                'created': page.created, 'length': len(page.body),
+                'variants': {encoding: len(data) for encoding, data in page.variants.items()}}
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(json.dumps(meta).encode() + b'\n')
+                f.write(page.body)
+                for data in page.variants.values():
+                    f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write cached page to {path}: {e}")
+            return
+
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self.prune()
+
+    def prune(self):
+        """Drop the least recently written pages beyond ``max_entries``"""
+        try:
+            entries = [entry for entry in os.scandir(self.directory)
+                       if entry.name.endswith('.page')]
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - self.max_entries]:
+                os.remove(entry.path)
+        except OSError as e:
+            print(f"Error pruning page cache {self.directory}: {e}")
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.page'):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def lock_path(self, stripe: int) -> Optional[str]:
+        return os.path.join(self.directory, f'.fill-{stripe}.lock')
+
+    def stats(self) -> Dict:
+        try:
+            sizes = [entry.stat().st_size for entry in os.scandir(self.directory)
+                     if entry.name.endswith('.page')]
+        except OSError:
+            sizes = []
+        return {'entries': len(sizes), 'bytes': sum(sizes), 'directory': self.directory}
+
+
+class FillLock:
+    """Held while one request renders a missing page"""
+
+    def __init__(self, thread_lock: threading.Lock, lock_file=None):
+        self.thread_lock = thread_lock
+        self.lock_file = lock_file
+
+    def release(self):
+        if self.lock_file is not None:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+        if self.thread_lock is not None:
+            self.thread_lock.release()
+            self.thread_lock = None
+
+
+class ResponseCache:
+    """Versioned page cache with stampede protection"""
+
+    def __init__(self, backend, ttl: float = 300, lock_timeout: float = 5.0,
+                 stripes: int = 64, compress_min_size: int = 1024):
+        self.backend = backend
+        self.ttl = ttl
+        self.compress_min_size = compress_min_size
+        self.lock_timeout = lock_timeout
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        self._stats_lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'fills': 0, 'lock_waits': 0,
+                         'lock_timeouts': 0}
+
+    @staticmethod
+    def make_key(path: str, args: Iterable[Tuple[str, str]], versions: Dict[str, int]) -> str:
+        """``path?sorted query#name=version,...``"""
+        items = args.items(multi=True) if hasattr(args, 'items') else args
+        query = urlencode(sorted(items))
+        tags = ','.join(f'{name}={versions[name]}' for name in sorted(versions))
+        return f'{path}?{query}#{tags}'
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.counters[name] += 1
+
+    def get(self, key: str) -> Optional[CachedPage]:
+        page = self.backend.get(key)
+        if page is not None and time.time() - page.created <= self.ttl:
+            return page
+        return None
+
+    def lookup(self, key: str) -> Tuple[Optional[CachedPage], Optional[FillLock]]:
+        """``(page, None)`` on a hit, else ``(None, fill_lock)``.
+
+        On a miss the caller renders the page, passes it to ``store`` and
+        then releases the lock. The lock is None if waiting for it timed
+        out; the caller then renders without it rather than queueing
+        behind a stuck request.
+        """
+        page = self.get(key)
+        if page is None:
+            fill_lock = self.lock(key)
+            # Whoever held the lock may have just rendered this page
+            page = self.get(key)
+            if page is None:
+                self._count('misses')
+                return None, fill_lock
+            if fill_lock is not None:
+                fill_lock.release()
+        self._count('hits')
+        return page, None
+
+    def lock(self, key: str) -> Optional[FillLock]:
+        """Take the fill lock for ``key``, waiting up to ``lock_timeout``"""
+        stripe = int(hashlib.blake2b(key.encode(), digest_size=4).hexdigest(), 16) % len(self._stripes)
+        thread_lock = self._stripes[stripe]
+        if not thread_lock.acquire(blocking=False):
+            self._count('lock_waits')
+            if not thread_lock.acquire(timeout=self.lock_timeout):
+                self._count('lock_timeouts')
+                return None
+
+        lock_path = self.backend.lock_path(stripe)
+        if lock_path is None or fcntl is None:
+            return FillLock(thread_lock)
+
+        deadline = time.monotonic() + self.lock_timeout
+        try:
+            lock_file = open(lock_path, 'w')
+        except OSError as e:
+            print(f"Could not open page cache lock {lock_path}: {e}")
+            return FillLock(thread_lock)
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return FillLock(thread_lock, lock_file)
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    lock_file.close()
+                    thread_lock.release()
+                    self._count('lock_timeouts')
+                    return None
+                time.sleep(0.02)
+
+    def store(self, key: str, response) -> Optional[CachedPage]:
+        """Cache a rendered response if it is a complete, cookie-free 200"""
+        if response.status_code != 200 or response.is_streamed or \
+                'Set-Cookie' in response.headers:
+            return None
+        headers = [(name, value) for name, value in response.headers.items()
+                   if name.lower() not in SKIP_HEADERS]
+        body = response.get_data()
+        variants = compress_variants(body, self.compress_min_size) \
+            if is_compressible(response.mimetype) else {}
+        page = CachedPage(response.status_code, headers, body, time.time(), variants)
+        self.backend.set(key, page)
+        self._count('fills')
+        return page
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            counters = dict(self.counters)
+        lookups = counters['hits'] + counters['misses']
+        return dict(counters, **self.backend.stats(), backend=self.backend.name,
+                    ttl=self.ttl,
+                    hit_rate=round(counters['hits'] / lookups, 3) if lookups else None)
+
+
+def build_response_cache(spec: Optional[str] = None) -> Optional[ResponseCache]:
+    """Cache from RESPONSE_CACHE (``memory``, ``file`` or ``off``)"""
+    spec = (spec or os.environ.get('RESPONSE_CACHE', 'memory')).strip().lower()
+    if spec in ('off', 'none', 'false', ''):
+        return None
+    if spec == 'memory':
+        backend = MemoryBackend(
+            max_entries=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '500')))
+    elif spec == 'file':
+        backend = FileBackend(
+            os.environ.get('RESPONSE_CACHE_DIR', 'page_cache'),
+            max_entries=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '2000')))
+    else:
+        raise ValueError(f"Unknown response cache backend {spec!r}")
+    return ResponseCache(backend, ttl=float(os.environ.get('RESPONSE_CACHE_TTL', '300')),
+                         compress_min_size=int(os.environ.get('COMPRESS_MIN_SIZE', '1024')))
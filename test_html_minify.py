@@ -0,0 +1,77 @@
+"""
+Tests for html_minify.minify_html
+"""
+
+from html_minify import minify_html
+
+
+def test_collapses_whitespace_between_blocks():
+    html = '<div>\n    <p>  Bitcoin   rallies  </p>\n    <p>Ether too</p>\n</div>\n'
+    assert minify_html(html) == '<div><p>Bitcoin rallies</p><p>Ether too</p></div>'
+
+
+def test_keeps_the_space_between_inline_elements():
+    html = '<p><a href="/a">BTC</a>\n    <span>up</span> <b>5%</b></p>'
+    assert minify_html(html) == '<p><a href="/a">BTC</a> <span>up</span> <b>5%</b></p>'
+
+
+def test_drops_comments_but_keeps_conditional_comments():
+    html = '<p>a</p><!-- note --><p>b</p><!--[if IE]><p>old</p><![endif]-->'
+    assert minify_html(html) == '<p>a</p><p>b</p><!--[if IE]><p>old</p><![endif]-->'
+
+
+def test_keeps_doctype():
+    assert minify_html('<!DOCTYPE html>\n<html>\n</html>') == '<!DOCTYPE html><html></html>'
+
+
+def test_pre_is_copied_untouched():
+    html = '<div>\n  <pre>line 1\n    indented  <b> bold </b>\n\n<!-- kept --></pre>\n</div>'
+    assert minify_html(html) == (
+        '<div><pre>line 1\n    indented  <b> bold </b>\n\n<!-- kept --></pre></div>')
+
+
+def test_nested_pre_ends_at_the_matching_tag():
+    html = '<pre>a  <pre>b  </pre>  c  </pre>  <p> d </p>'
+    assert minify_html(html) == '<pre>a  <pre>b  </pre>  c  </pre><p>d</p>'
+
+
+def test_script_is_copied_untouched():
+    script = '<script>\n  var html = "<p>  x  </p>";  // <!-- not a comment -->\n  if (a < b) {}\n</script>'
+    assert minify_html(f'<div>\n  {script}\n</div>') == f'<div>{script}</div>'
+
+
+def test_style_is_copied_untouched():
+    style = '<style>\n  p  >  a { content: "  "; }\n</style>'
+    assert minify_html(style) == style
+
+
+def test_textarea_is_copied_untouched():
+    html = '<form>\n  <textarea name="body">  first\n\n  <b>second</b>  </textarea>\n</form>'
+    assert minify_html(html) == (
+        '<form><textarea name="body">  first\n\n  <b>second</b>  </textarea></form>')
+
+
+def test_white_space_pre_style_is_preserved():
+    html = '<div style="white-space: pre-wrap">Para one\n\n  Para two</div>\n<p> x </p>'
+    assert minify_html(html) == '<div style="white-space: pre-wrap">Para one\n\n  Para two</div><p>x</p>'
+
+
+def test_unclosed_raw_text_element_keeps_the_rest():
+    html = '<p>a</p><script>  never   closed'
+    assert minify_html(html) == html
+
+
+def test_bare_less_than_is_text():
+    assert minify_html('<p>1 <  2</p>') == '<p>1 < 2</p>'
+
+
+def test_attribute_values_are_not_touched():
+    html = '<p title="a  >  b" data-x=\'  y  \'>t</p>'
+    assert minify_html(html) == html
+
+
+def test_minifying_twice_changes_nothing():
+    html = ('<div>\n  <p>Hello   <em>world</em>\n  </p>\n  <pre> a\n b</pre>\n'
+            '  <textarea> x </textarea>\n</div>')
+    once = minify_html(html)
+    assert minify_html(once) == once
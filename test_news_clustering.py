@@ -0,0 +1,119 @@
+"""
+Tests for news_clustering and clustered ingest in NewsItem.bulk_ingest
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from models import db, NewsItem
+from news_clustering import StoryClusterer, one_per_story
+
+ETF_TITLE = 'SEC approves first spot bitcoin ETF after decade of rejections'
+ETF_SUMMARY = ('The Securities and Exchange Commission approved eleven spot bitcoin '
+               'exchange traded funds on Wednesday, ending a decade long fight with '
+               'asset managers.')
+FORK_TITLE = 'Ethereum developers schedule Dencun upgrade for March'
+FORK_SUMMARY = 'Core devs picked a mainnet date for the next hard fork on their weekly call.'
+
+
+def article(key, title, summary):
+    return {'id': key, 'title': title, 'summary': summary, 'url': f'https://example.com/{key}',
+            'source': 'Test', 'published': '2024-01-10T12:00:00'}
+
+
+def test_syndicated_copy_joins_the_first_cluster():
+    clusterer = StoryClusterer()
+    assert clusterer.assign('a', ETF_TITLE, ETF_SUMMARY, now=1000) == 'a'
+    assert clusterer.assign('b', f'Breaking: {ETF_TITLE}', ETF_SUMMARY, now=1100) == 'a'
+    assert clusterer.assign('c', FORK_TITLE, FORK_SUMMARY, now=1200) == 'c'
+
+
+def test_case_and_stopwords_do_not_matter():
+    clusterer = StoryClusterer()
+    assert clusterer.fingerprint(ETF_TITLE) == clusterer.fingerprint(f'The {ETF_TITLE.upper()}')
+
+
+def test_stories_outside_the_window_expire():
+    clusterer = StoryClusterer(window=3600)
+    clusterer.assign('a', ETF_TITLE, ETF_SUMMARY, now=0)
+    assert clusterer.assign('b', ETF_TITLE, ETF_SUMMARY, now=7200) == 'b'
+    assert len(clusterer) == 1
+
+
+def test_discard_removes_a_story_from_the_index():
+    clusterer = StoryClusterer()
+    clusterer.assign('a', ETF_TITLE, ETF_SUMMARY, now=1000)
+    clusterer.discard(['a'])
+    assert len(clusterer) == 0
+    assert clusterer.assign('b', ETF_TITLE, ETF_SUMMARY, now=1100) == 'b'
+
+
+def test_warm_keeps_stored_cluster_ids():
+    clusterer = StoryClusterer()
+    clusterer.warm([('a', ETF_TITLE, ETF_SUMMARY, 'original', 1000),
+                    ('b', FORK_TITLE, FORK_SUMMARY, None, 1001)])
+    assert clusterer.warmed
+    assert clusterer.assign('c', ETF_TITLE, ETF_SUMMARY, now=1100) == 'original'
+    assert clusterer.assign('d', FORK_TITLE, FORK_SUMMARY, now=1100) == 'b'
+
+
+def test_bands_must_divide_bits():
+    with pytest.raises(ValueError):
+        StoryClusterer(bits=64, bands=7)
+
+
+def test_one_per_story_keeps_the_first_of_each_cluster():
+    items = [SimpleNamespace(external_id='a', cluster_id='x'),
+             SimpleNamespace(external_id='b', cluster_id='x'),
+             SimpleNamespace(external_id='c', cluster_id=None),
+             SimpleNamespace(external_id='d', cluster_id='y')]
+    assert [item.external_id for item in one_per_story(items, 10)] == ['a', 'c', 'd']
+    assert [item.external_id for item in one_per_story(items, 2)] == ['a', 'c']
+
+
+def test_bulk_ingest_stores_cluster_ids(app):
+    clusterer = StoryClusterer()
+    result = NewsItem.bulk_ingest([
+        article('a', ETF_TITLE, ETF_SUMMARY),
+        article('b', f'Breaking: {ETF_TITLE}', ETF_SUMMARY),
+        article('c', FORK_TITLE, FORK_SUMMARY),
+    ], clusterer)
+    assert result == {'inserted': 3, 'skipped': 0}
+    stored = dict(db.session.query(NewsItem.external_id, NewsItem.cluster_id))
+    assert stored == {'a': 'a', 'b': 'a', 'c': 'c'}
+    assert [item.external_id for item in NewsItem.latest_stories()] == ['a', 'c']
+
+
+def test_bulk_ingest_skips_stored_rows_without_indexing_them(app):
+    clusterer = StoryClusterer()
+    NewsItem.bulk_ingest([article('a', ETF_TITLE, ETF_SUMMARY)], clusterer)
+    result = NewsItem.bulk_ingest([article('a', ETF_TITLE, ETF_SUMMARY)], clusterer)
+    assert result == {'inserted': 0, 'skipped': 1}
+    assert len(clusterer) == 1
+
+
+def test_bulk_ingest_discards_clusters_when_the_insert_fails(app, monkeypatch):
+    clusterer = StoryClusterer()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('database went away')
+
+    monkeypatch.setattr(db.session, 'execute', fail)
+    with pytest.raises(RuntimeError):
+        NewsItem.bulk_ingest([article('a', ETF_TITLE, ETF_SUMMARY)], clusterer)
+    assert len(clusterer) == 0
+
+
+def test_migrate_cluster_column_is_idempotent(app):
+    db.session.execute(db.text('DROP INDEX ix_news_items_cluster_id'))
+    db.session.execute(db.text('ALTER TABLE news_items DROP COLUMN cluster_id'))
+    db.session.execute(db.text(
+        "INSERT INTO news_items (external_id, title, url) VALUES ('old', 'Old story', 'https://example.com')"))
+    db.session.commit()
+
+    assert NewsItem.migrate_cluster_column() is True
+    assert NewsItem.migrate_cluster_column() is False
+    indexes = {index['name'] for index in db.inspect(db.engine).get_indexes('news_items')}
+    assert 'ix_news_items_cluster_id' in indexes
+    assert db.session.query(NewsItem.cluster_id).scalar() == 'old'
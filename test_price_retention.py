@@ -0,0 +1,117 @@
+"""
+Tests for price_retention rollups, pruning and tier-split reads
+"""
+
+from datetime import datetime, timedelta
+
+from models import db, PriceData, PriceOHLC1h, PriceOHLC1d, SiteSettings
+from price_retention import (DAILY, HOURLY, RAW, prune, query_closes, query_range,
+                             rollup, run_retention)
+
+START = datetime(2024, 1, 1)
+
+
+def add_ticks(start, hours, symbol='BTC', every_minutes=15):
+    """One tick every ``every_minutes``; the price is the minute offset from START"""
+    ticks = []
+    ts = start
+    while ts < start + timedelta(hours=hours):
+        price = (ts - START).total_seconds() / 60
+        ticks.append(PriceData(symbol=symbol, price_usd=price, market_cap=1, volume_24h=1,
+                               timestamp=ts))
+        ts += timedelta(minutes=every_minutes)
+    db.session.add_all(ticks)
+    db.session.commit()
+    return len(ticks)
+
+
+def test_hourly_rollup_builds_ohlc(app):
+    add_ticks(START, 3)
+    assert rollup(HOURLY, now=START + timedelta(hours=3)) == 3
+
+    first = PriceOHLC1h.query.order_by(PriceOHLC1h.bucket).first()
+    assert first.bucket == START
+    assert (first.open, first.high, first.low, first.close) == (0, 45, 0, 45)
+    assert first.samples == 4
+    assert HOURLY.watermark() == START + timedelta(hours=3)
+
+
+def test_rollup_skips_the_unfinished_period(app):
+    add_ticks(START, 3)
+    assert rollup(HOURLY, now=START + timedelta(hours=2, minutes=30)) == 2
+    assert HOURLY.watermark() == START + timedelta(hours=2)
+
+
+def test_rollup_is_idempotent(app):
+    add_ticks(START, 48)
+    now = START + timedelta(days=2)
+    assert rollup(HOURLY, now) == 48
+    # Nothing past the watermark, so a second run writes nothing
+    assert rollup(HOURLY, now) == 0
+    assert PriceOHLC1h.query.count() == 48
+
+    # Re-running a batch from an older watermark replaces rather than duplicates it
+    SiteSettings.set(HOURLY.watermark_key, START.isoformat())
+    assert rollup(HOURLY, now) == 48
+    assert PriceOHLC1h.query.count() == 48
+
+
+def test_daily_rollup_waits_for_the_hourly_tier(app):
+    add_ticks(START, 48)
+    now = START + timedelta(days=2)
+    assert rollup(DAILY, now) == 0
+
+    rollup(HOURLY, now)
+    assert rollup(DAILY, now) == 2
+    day = PriceOHLC1d.query.order_by(PriceOHLC1d.bucket).first()
+    assert (day.open, day.close, day.samples) == (0, 23 * 60 + 45, 96)
+
+
+def test_prune_keeps_rows_the_next_tier_does_not_cover(app):
+    add_ticks(START, 48)
+    now = START + timedelta(days=RAW.retention_days + 2)
+    # No hourly rollup yet: raw rows are past retention but must stay
+    assert prune(RAW, now) == 0
+
+    SiteSettings.set(HOURLY.watermark_key, (START + timedelta(days=1)).isoformat())
+    assert prune(RAW, now, batch_size=10) == 96
+    assert db.session.query(db.func.min(PriceData.timestamp)).scalar() == START + timedelta(days=1)
+
+
+def test_run_retention_reports_counts(app):
+    add_ticks(START, 48)
+    counts = run_retention(now=START + timedelta(days=RAW.retention_days + 2))
+    assert counts == {'rolled_1h': 48, 'rolled_1d': 2, 'pruned_raw': 192, 'pruned_1h': 0}
+    assert PriceData.query.count() == 0
+
+
+def test_query_range_splits_at_the_watermark(app):
+    add_ticks(START, 4)
+    rollup(HOURLY, now=START + timedelta(hours=2))
+
+    resolution, rows = query_range('btc', START, START + timedelta(hours=4), resolution='1h')
+    assert resolution == '1h'
+    times = [row[0] for row in rows]
+    # Two hourly rows up to the watermark, then every raw tick after it
+    assert times[:2] == [START, START + timedelta(hours=1)]
+    assert times[2:] == [START + timedelta(hours=2, minutes=15 * i) for i in range(8)]
+    assert times == sorted(times)
+
+
+def test_query_range_picks_the_finest_tier_still_kept(app):
+    now = datetime.utcnow()
+    assert query_range('BTC', now - timedelta(hours=1), now)[0] == 'raw'
+    assert query_range('BTC', now - timedelta(days=30), now)[0] == '1h'
+    assert query_range('BTC', now - timedelta(days=400), now)[0] == '1d'
+
+
+def test_query_closes_spans_tiers_for_many_symbols(app):
+    add_ticks(START, 2, symbol='BTC')
+    add_ticks(START, 2, symbol='ETH')
+    rollup(HOURLY, now=START + timedelta(hours=1))
+
+    rows = query_closes(['btc', 'eth'], START, START + timedelta(hours=2))
+    assert {symbol for symbol, _, _ in rows} == {'BTC', 'ETH'}
+    # One hourly close per symbol, then four raw ticks each
+    assert len(rows) == 2 + 8
+    assert [ts for _, ts, _ in rows] == sorted(ts for _, ts, _ in rows)
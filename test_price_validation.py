@@ -0,0 +1,115 @@
+"""
+Tests for price_validation.PriceValidator
+"""
+
+from datetime import datetime, timedelta
+
+from price_validation import PriceValidator
+
+HISTORY = [100.0, 101.0, 99.0, 100.5, 99.5, 100.0]
+
+
+def quote(price):
+    return {'price_usd': price}
+
+
+def warmed(**kwargs):
+    validator = PriceValidator(**kwargs)
+    validator.warm(('BTC', price) for price in HISTORY)
+    return validator
+
+
+def test_invalid_prices_are_rejected():
+    validator = PriceValidator()
+    quotes = {'A': quote(None), 'B': quote(0), 'C': quote(-1.0), 'D': quote(float('nan')),
+              'E': quote(float('inf')), 'F': quote('100'), 'G': quote(1.5)}
+    assert list(validator.validate(quotes, list(quotes))) == ['G']
+    assert validator.metrics['rejected_invalid'] == 6
+    assert 'invalid price' in validator.last_rejections['A']['reason']
+
+
+def test_short_history_accepts_anything_valid():
+    validator = PriceValidator()
+    validator.warm([('BTC', 100.0), ('BTC', 100.0)])
+    assert 'BTC' in validator.validate({'BTC': quote(1000.0)}, ['BTC'])
+
+
+def test_normal_move_is_accepted():
+    validator = warmed()
+    assert 'BTC' in validator.validate({'BTC': quote(103.0)}, ['BTC'])
+    assert validator.history['BTC'][-1] == 103.0
+
+
+def test_mad_outlier_is_rejected():
+    validator = warmed()
+    assert validator.validate({'BTC': quote(1000.0)}, ['BTC']) == {}
+    assert validator.metrics['rejected_outlier'] == 1
+    assert 'away from recent median' in validator.last_rejections['BTC']['reason']
+    # Rejected prices never enter the history
+    assert 1000.0 not in validator.history['BTC']
+
+
+def test_relative_floor_spares_flat_series():
+    validator = PriceValidator()
+    validator.warm(('USDT', 1.0) for _ in range(6))
+    # MAD is zero, but a 1% move is well inside min_deviation
+    assert 'USDT' in validator.validate({'USDT': quote(1.01)}, ['USDT'])
+
+
+def test_consistent_run_becomes_the_new_level():
+    validator = warmed(max_rejections=3)
+    for price in (150.0, 151.0):
+        assert validator.validate({'BTC': quote(price)}, ['BTC']) == {}
+    assert 'BTC' in validator.validate({'BTC': quote(150.5)}, ['BTC'])
+    assert list(validator.history['BTC']) == [150.0, 151.0, 150.5]
+    assert 'BTC' not in validator.rejections
+    # Later quotes are judged against the new level
+    assert 'BTC' in validator.validate({'BTC': quote(152.0)}, ['BTC'])
+
+
+def test_scattered_bad_ticks_never_become_a_level():
+    validator = warmed(max_rejections=3)
+    for price in (1000.0, 5.0, 400.0, 2000.0, 10.0):
+        assert validator.validate({'BTC': quote(price)}, ['BTC']) == {}
+    assert validator.metrics['rejected_outlier'] == 5
+    assert max(validator.history['BTC']) == 101.0
+
+
+def test_accepted_quote_resets_the_rejected_run():
+    validator = warmed(max_rejections=3)
+    validator.validate({'BTC': quote(150.0)}, ['BTC'])
+    validator.validate({'BTC': quote(150.0)}, ['BTC'])
+    assert 'BTC' in validator.validate({'BTC': quote(100.0)}, ['BTC'])
+    # The run starts over, so one more outlier is not enough
+    assert validator.validate({'BTC': quote(150.0)}, ['BTC']) == {}
+
+
+def test_refresh_metrics():
+    validator = PriceValidator()
+    validator.validate({'BTC': quote(100.0)}, ['BTC', 'ETH'])
+    assert validator.metrics['accepted'] == 1
+    assert validator.metrics['missing'] == 1
+    assert validator.metrics['last_error'] is None
+
+    validator.validate({}, ['BTC'])
+    assert validator.metrics['failed_refreshes'] == 1
+    validator.record_failure('timeout')
+    assert validator.metrics['refreshes'] == 3
+    assert validator.metrics['last_error'] == 'timeout'
+
+
+def test_stale_symbols_and_status():
+    validator = PriceValidator(stale_after=900)
+    now = datetime(2024, 1, 1, 12)
+    epoch = (now - datetime(1970, 1, 1)).total_seconds()
+    prices = {
+        'BTC': {'updated': (now - timedelta(minutes=5)).isoformat()},
+        'ETH': {'updated': (now - timedelta(hours=1)).isoformat()},
+        'SOL': {},
+    }
+    assert validator.stale_symbols(prices, now=epoch) == ['ETH', 'SOL']
+
+    fresh = {'BTC': {'updated': datetime.utcnow().isoformat()}}
+    status = validator.status(fresh)
+    assert status['healthy'] and status['stale'] == []
+    assert not validator.status({})['healthy']
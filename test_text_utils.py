@@ -0,0 +1,52 @@
+"""
+Tests for text_utils.html_to_text
+"""
+
+import pytest
+from bs4 import BeautifulSoup
+
+from text_utils import html_to_text
+
+SAMPLES = [
+    '<p>Bitcoin &amp; Ether rally</p>',
+    '  <div><b>Breaking:</b>   ETF approved</div>  ',
+    '<p>Price <a href="https://example.com/?a=1&amp;b=2" title=\'x > y\'>here</a></p>',
+    'BTC < ETH is a bare bracket',
+    '<img src="chart.png" alt="chart"/>Caption',
+    '<p>One</p><!-- tracking pixel --><p>Two</p>',
+    '&lt;script&gt; is escaped text',
+]
+
+
+@pytest.mark.parametrize('html', SAMPLES)
+def test_matches_beautifulsoup(html):
+    assert html_to_text(html) == BeautifulSoup(html, 'html.parser').get_text().strip()
+
+
+def test_empty_input():
+    assert html_to_text(None) == ''
+    assert html_to_text('') == ''
+
+
+def test_script_and_style_contents_are_dropped():
+    html = '<script>var s = "<p>hidden</p>";</script>Visible<style>p { color: red }</style>'
+    assert html_to_text(html) == 'Visible'
+
+
+def test_unclosed_script_drops_the_rest():
+    assert html_to_text('Lead<script>never closed <p>text</p>') == 'Lead'
+
+
+def test_cdata_is_kept_literally():
+    assert html_to_text('x<![CDATA[<raw> &amp;]]>') == 'x<raw> &amp;'
+
+
+def test_max_length_truncates_with_ellipsis():
+    text = html_to_text('<p>' + 'word ' * 50 + '</p>', max_length=20)
+    assert text == 'word word word wo...'
+    assert len(text) == 20
+
+
+def test_max_length_ignores_trailing_whitespace():
+    assert html_to_text('abc   ', max_length=3) == 'abc'
+    assert html_to_text('<p>abc</p>\n\n', max_length=3) == 'abc'
@@ -0,0 +1,102 @@
+"""
+Lightweight text helpers for scraped content
+"""
+
+import re
+from html import unescape
+from typing import Optional
+
+# Markup that is dropped without producing text. Only called at a '<'.
+_COMMENT_RE = re.compile(r'<!--.*?(?:-->|\Z)', re.DOTALL)
+_CDATA_RE = re.compile(r'<!\[CDATA\[(.*?)(?:\]\]>|\Z)', re.DOTALL)
+_DECLARATION_RE = re.compile(r'<[!?][^>]*>?')
+_TAG_RE = re.compile(
+    r'<(/?)([a-zA-Z][^\s/>]*)(?:[^>"\']|"[^"]*"|\'[^\']*\')*>')
+
+# Elements whose contents are not visible text
+_RAW_TEXT_ELEMENTS = ('script', 'style')
+_RAW_TEXT_END_RE = {
+    name: re.compile(rf'</{name}\s*>', re.IGNORECASE) for name in _RAW_TEXT_ELEMENTS
+}
+
+
+def html_to_text(html: Optional[str], max_length: Optional[int] = None) -> str:
+    """Strip tags and decode entities from an HTML fragment.
+
+    Produces the same text as ``BeautifulSoup(html, 'html.parser').get_text().strip()``
+    for feed summaries, but scans the string left to right without building a
+    tree. With ``max_length`` the result is cut to that many characters
+    (ending in '...') and scanning stops as soon as the budget is exceeded.
+    """
+    if not html:
+        return ''
+
+    parts = []
+    length = 0
+    started = False
+    pos = 0
+    end = len(html)
+
+    while pos < end:
+        lt = html.find('<', pos)
+        if lt == -1:
+            lt = end
+
+        if lt > pos:
+            text = unescape(html[pos:lt])
+            if not started:
+                text = text.lstrip()
+                started = bool(text)
+            if text:
+                parts.append(text)
+                length += len(text)
+                if max_length is not None and length > max_length:
+                    # Only stop once something other than whitespace is past the limit
+                    joined = ''.join(parts)
+                    if len(joined.rstrip()) > max_length:
+                        return joined[:max_length - 3] + '...'
+                    parts = [joined]
+        if lt >= end:
+            break
+
+        if html.startswith('<!--', lt):
+            pos = _COMMENT_RE.match(html, lt).end()
+            continue
+
+        match = _CDATA_RE.match(html, lt)
+        if match:
+            # CDATA content is literal text, so it is not entity-decoded
+            text = match.group(1)
+            if not started:
+                text = text.lstrip()
+                started = bool(text)
+            if text:
+                parts.append(text)
+                length += len(text)
+            pos = match.end()
+            continue
+
+        match = _DECLARATION_RE.match(html, lt)
+        if match:
+            pos = match.end()
+            continue
+
+        match = _TAG_RE.match(html, lt)
+        if not match:
+            # A bare '<' is just text
+            parts.append('<')
+            length += 1
+            started = True
+            pos = lt + 1
+            continue
+
+        pos = match.end()
+        name = match.group(2).lower()
+        if not match.group(1) and name in _RAW_TEXT_ELEMENTS:
+            closing = _RAW_TEXT_END_RE[name].search(html, pos)
+            pos = closing.end() if closing else end
+
+    text = ''.join(parts).rstrip()
+    if max_length is not None and len(text) > max_length:
+        return text[:max_length - 3] + '...'
+    return text
@@ -0,0 +1,71 @@
+"""
+URL canonicalization and article identity
+"""
+
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a click came from. Generic names
+# such as ``ref`` or ``src`` stay out: some sites use them to pick content
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'ref_src', 'cmpid',
+    'ocid', '_ga', '_hsenc', '_hsmi', 'mkt_tok', 'guccounter', 'soc_src', 'soc_trk'
+}
+TRACKING_PREFIXES = ('utm_', 'mc_')
+
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so the same story always maps to the same string.
+
+    Lowercases the scheme and host, treats http and https (and a leading
+    ``www.``) as equivalent, drops default ports, fragments, trailing
+    slashes and tracking parameters, and sorts what is left of the query.
+    A URL too malformed to parse (e.g. a non-numeric port) is returned
+    stripped but otherwise unchanged.
+    """
+    if not url:
+        return ''
+
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url.strip()
+    scheme = parts.scheme.lower()
+    default_port = DEFAULT_PORTS.get(scheme)
+    if scheme == 'http':
+        scheme = 'https'
+
+    host = (parts.hostname or '').lower().rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    if port and str(port) != default_port:
+        host = f'{host}:{port}'
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name)
+    )
+
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+def url_fingerprint(url: str) -> str:
+    """128-bit hex fingerprint of the canonical form of ``url``.
+
+    blake2b is the fastest hash in the standard library and the 32 hex
+    characters fit the existing ``news_items.external_id`` column.
+    """
+    return hashlib.blake2b(canonicalize_url(url).encode('utf-8'),
+                           digest_size=16).hexdigest()